@@ -0,0 +1,363 @@
+"""End-to-end benchmark of the restaurant agent without Ollama or HuggingFace.
+
+The runtime gets two deterministic stand-ins:
+
+* FakeChatModel answers the extraction prompt with the JSON the real prompt
+  asks for (cities and cuisines matched by name in the history and input)
+  and the result prompt with a fixed text, after ``latency`` seconds. It sits
+  behind the normal LLMGateway, so queueing overhead is still measured.
+* HashingEmbeddings maps words to a fixed-size signed bag-of-words vector.
+
+A synthetic catalog is indexed into ``--workdir``, then conversation scripts
+are replayed through the compiled graph. Each JSONL line is either
+{"turns": ["...", ...]} or a single message under "message", "body" or
+"title", so requests.jsonl works as a script file too. For every pass the
+benchmark reports turn latency, time per graph node, LLM calls, retrieval
+time and the runtime's cache statistics. Later passes (``--repeat``) show
+the effect of the caches.
+
+    python bench_agent.py --scripts conversations.jsonl --llm-latency 0.2 --repeat 2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from bench_server import percentile
+from fast_path import CUISINES, SUPPORTED_CITIES
+
+DEFAULT_SCRIPTS = [
+    {"turns": ["Italian restaurant in New York"]},
+    {"turns": ["I want to eat in Seattle", "Thai and Vietnamese please"]},
+    {"turns": ["Restaurant in Paris", "Ok, Los Angeles then", "Mexican"]},
+    {"turns": ["Something good for dinner", "Las Vegas", "American, Seafood"]},
+    {"turns": ["Japanese food in Seattle"]},
+]
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model with a fixed latency, counting its calls."""
+
+    latency: float = 0.0
+    extraction_calls: int = 0
+    render_calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-restaurant-agent"
+
+    @staticmethod
+    def _mentions(text: str, names: List[str]) -> List[str]:
+        """``names`` mentioned in ``text``, in order of appearance."""
+        lowered = text.lower()
+        found = sorted((match.start(), name) for name in names
+                       for match in re.finditer(rf"\b{re.escape(name.lower())}\b", lowered))
+        return list(dict.fromkeys(name for _, name in found))
+
+    def _reply(self, messages) -> str:
+        system = str(messages[0].content)
+        if "Extract the following" not in system:
+            self.render_calls += 1
+            return "Here are some restaurants you might like."
+        self.extraction_calls += 1
+        # Slots come from the "Known so far" line, the user's turns and the latest input, never
+        # from the assistant's replies (which list example cuisines); the latest mention wins
+        history, _, latest = system.rsplit("History:", 1)[-1].partition("Latest input:")
+        segments = [line.strip() for line in history.splitlines()
+                    if line.strip().startswith(("Known so far:", "human:"))] + [latest]
+        city, cuisines = None, None
+        for segment in segments:
+            city = (self._mentions(segment, SUPPORTED_CITIES) or [city])[-1]
+            cuisines = self._mentions(segment, CUISINES) or cuisines
+        if city is None:
+            response = "Please tell me the city (New York, Los Angeles, Seattle or Las Vegas)."
+        elif cuisines is None:
+            response = "Please provide cuisine details (e.g., American , Asian , Italian)."
+        else:
+            response = "Ready to search"
+        return json.dumps({"city": city, "cuisine": cuisines, "response": response})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+
+class HashingEmbeddings(Embeddings):
+    """Signed feature hashing of lowercase words, L2-normalized."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.calls = 0
+        self.texts = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+            vector[digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        self.texts += 1
+        return self._embed(text)
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Wall time of every graph node run, from the callback events LangGraph emits."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: Dict[Any, tuple] = {}
+        self.times: Dict[str, List[float]] = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, tags=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Only the run the graph starts for the node (tagged with its step), not the runnables inside it
+        step = any(tag.startswith("graph:step:") for tag in tags or ())
+        if node is not None and kwargs.get("name") == node and step:
+            with self._lock:
+                self._started[run_id] = (node, time.perf_counter())
+
+    def _finish(self, run_id):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+            if started is not None:
+                node, start = started
+                self.times.setdefault(node, []).append(time.perf_counter() - start)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+
+def generate_catalog(path: str, size: int, seed: int = 0):
+    rng = random.Random(seed)
+    records = [{
+        "id": str(i),
+        "name": f"Restaurant {i}",
+        "city": rng.choice(SUPPORTED_CITIES),
+        "cuisines": rng.sample(CUISINES, k=rng.randint(1, 3)),
+        "rating": round(rng.uniform(3.0, 5.0), 1),
+        "description": f"Neighbourhood spot number {i}.",
+        "image": f"https://example.com/{i}.jpg",
+    } for i in range(size)]
+    with open(path, "w") as f:
+        json.dump(records, f)
+
+
+def load_scripts(path: Optional[str]) -> List[List[str]]:
+    if not path:
+        return [script["turns"] for script in DEFAULT_SCRIPTS]
+    scripts = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if isinstance(entry.get("turns"), list):
+                scripts.append([str(turn) for turn in entry["turns"]])
+            else:
+                text = entry.get("message") or entry.get("body") or entry.get("title")
+                if text:
+                    scripts.append([str(text)])
+    return scripts
+
+
+def _summary(values: List[float]) -> dict:
+    ms = sorted(v * 1000 for v in values)
+    return {"count": len(ms), "total_ms": sum(ms), "mean_ms": statistics.fmean(ms) if ms else 0.0,
+            "p50_ms": percentile(ms, 50), "p95_ms": percentile(ms, 95), "max_ms": ms[-1] if ms else 0.0}
+
+
+class AgentBench:
+    """Sets up the agent runtime with the fakes and replays scripts through it."""
+
+    def __init__(self, workdir: str, catalog_size: int, llm_latency: float):
+        os.makedirs(workdir, exist_ok=True)
+        # The fakes are cheap, a process pool would only add start-up time
+        os.environ.setdefault("INDEX_WORKERS", "1")
+        import restauarant_search_agent as agent
+        from llm_gateway import LLMGateway
+
+        self.agent = agent
+        self.runtime = agent.runtime
+        self.runtime.hotels_file = os.path.join(workdir, f"catalog_{catalog_size}.json")
+        self.runtime.index_file = os.path.join(workdir, f"index_{catalog_size}.faiss")
+        if not os.path.exists(self.runtime.hotels_file):
+            generate_catalog(self.runtime.hotels_file, catalog_size)
+
+        self.llm = FakeChatModel(latency=llm_latency)
+        self.embeddings = HashingEmbeddings()
+        self.runtime._components["embeddings"] = self.embeddings
+        self.runtime._components["llm"] = LLMGateway(
+            self.llm, max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", 4)), timeout=60.0)
+
+        # search_hotels looks _retrieve up at call time, so a wrapper sees every retrieval
+        self.retrievals: List[float] = []
+        retrieve = agent._retrieve
+
+        def timed_retrieve(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return retrieve(*args, **kwargs)
+            finally:
+                self.retrievals.append(time.perf_counter() - start)
+        agent._retrieve = timed_retrieve
+
+    def setup(self) -> Dict[str, float]:
+        start = time.perf_counter()
+        self.runtime.warmup()
+        return {"warmup_ms": (time.perf_counter() - start) * 1000,
+                **{f"{name}_ms": seconds * 1000 for name, seconds in self.runtime.startup_profile.items()}}
+
+    def _run_sync(self, scripts: List[List[str]], timer: NodeTimer, turns: List[float]):
+        for script in scripts:
+            messages = None
+            for text in script:
+                start = time.perf_counter()
+                messages = self.agent.runtime.app.invoke(self.agent._turn_input(text, messages),
+                                                         {"callbacks": [timer]})["messages"]
+                turns.append(time.perf_counter() - start)
+
+    async def _run_async(self, scripts: List[List[str]], timer: NodeTimer, turns: List[float], concurrency: int):
+        pending = iter(scripts)
+
+        async def worker():
+            for script in pending:
+                messages = None
+                for text in script:
+                    start = time.perf_counter()
+                    result = await self.agent.runtime.app.ainvoke(self.agent._turn_input(text, messages),
+                                                                  {"callbacks": [timer]})
+                    messages = result["messages"]
+                    turns.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    def run_pass(self, scripts: List[List[str]], concurrency: int) -> dict:
+        timer, turns = NodeTimer(), []
+        self.retrievals = []
+        before = (self.llm.extraction_calls, self.llm.render_calls, self.embeddings.calls, self.embeddings.texts)
+        start = time.perf_counter()
+        if concurrency > 1:
+            asyncio.run(self._run_async(scripts, timer, turns, concurrency))
+        else:
+            self._run_sync(scripts, timer, turns)
+        elapsed = time.perf_counter() - start
+        return {
+            "conversations": len(scripts),
+            "turns": len(turns),
+            "seconds": elapsed,
+            "turns_per_second": len(turns) / elapsed if elapsed else 0.0,
+            "turn": _summary(turns),
+            "nodes": {node: _summary(times) for node, times in sorted(timer.times.items())},
+            "llm_calls": {"extraction": self.llm.extraction_calls - before[0],
+                          "render": self.llm.render_calls - before[1]},
+            "retrieval": _summary(self.retrievals),
+            "embedding_calls": self.embeddings.calls - before[2],
+            "embedded_texts": self.embeddings.texts - before[3],
+            "runtime_stats": self.runtime.stats(),
+        }
+
+
+def report(results: dict) -> str:
+    lines = []
+    for number, result in enumerate(results["passes"], 1):
+        lines.append(f"pass {number}: {result['turns']} turns in {result['seconds']:.2f}s "
+                     f"({result['turns_per_second']:.1f}/s), turn p50 {result['turn']['p50_ms']:.2f} ms "
+                     f"p95 {result['turn']['p95_ms']:.2f} ms")
+        for node, summary in result["nodes"].items():
+            lines.append(f"  {node:<16} n={summary['count']:<5} mean {summary['mean_ms']:8.2f} ms  "
+                         f"p95 {summary['p95_ms']:8.2f} ms")
+        lines.append(f"  llm calls        extraction={result['llm_calls']['extraction']} "
+                     f"render={result['llm_calls']['render']}")
+        lines.append(f"  retrieval        n={result['retrieval']['count']:<5} mean "
+                     f"{result['retrieval']['mean_ms']:8.2f} ms  embedding calls={result['embedding_calls']}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scripts", help="JSONL conversation scripts (default: built-in set)")
+    parser.add_argument("--repeat", type=int, default=2, help="passes over the scripts")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="conversations in flight (>1 uses the async graph)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake LLM call")
+    parser.add_argument("--catalog-size", type=int, default=2000)
+    parser.add_argument("--workdir", default=".bench_agent", help="synthetic catalog and index location")
+    parser.add_argument("--renderer", choices=["template", "jinja", "llm"], help="RESULT_RENDERER for the run")
+    parser.add_argument("--no-fast-path", action="store_true", help="send every extraction to the LLM")
+    parser.add_argument("--no-extraction-cache", action="store_true")
+    parser.add_argument("--out", default="bench_agent.json", help="result file")
+    parser.add_argument("--verbose", action="store_true", help="keep the agent's own output")
+    args = parser.parse_args(argv)
+
+    # Read when the agent module and its components are created
+    if args.renderer:
+        os.environ["RESULT_RENDERER"] = args.renderer
+    if args.no_fast_path:
+        os.environ["FAST_PATH"] = "0"
+    if args.no_extraction_cache:
+        os.environ["EXTRACTION_CACHE"] = "off"
+    os.environ.setdefault("EMBEDDING_CACHE_PREWARM", "0")
+
+    scripts = load_scripts(args.scripts)
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        bench = AgentBench(args.workdir, args.catalog_size, args.llm_latency)
+        setup = bench.setup()
+        passes = [bench.run_pass(scripts, args.concurrency) for _ in range(args.repeat)]
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"scripts": args.scripts or "built-in", "repeat": args.repeat, "concurrency": args.concurrency,
+                   "llm_latency": args.llm_latency, "catalog_size": args.catalog_size,
+                   "renderer": os.environ.get("RESULT_RENDERER", "template"),
+                   "fast_path": not args.no_fast_path, "extraction_cache": not args.no_extraction_cache},
+        "setup": setup,
+        "passes": passes,
+    }
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(report(results))
+    print(f"Results written to {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""Latency and throughput benchmark for the MCP server (server.py).
+
+The streamable HTTP app runs in-process behind httpx's ASGI transport, so
+the benchmark needs no network, no uvicorn and no OAuth server. For each
+scenario (tools/list, tools/call first_app_tool, resources/read of the
+widget) it sends ``--requests`` JSON-RPC calls from ``--concurrency``
+concurrent clients and reports
+
+* p50/p95/p99/max latency and requests per second;
+* allocations per request, from a separate sequential pass under
+  tracemalloc (peak bytes allocated while serving one request, and bytes
+  still held after the pass), kept apart so tracing does not skew latency.
+
+Results are written as JSON. With ``--baseline`` a previous result file is
+compared and the exit code is 1 when a p95 or RPS figure regresses by more
+than ``--max-regression`` percent.
+
+    python bench_server.py --concurrency 16 --requests 2000 --out bench.json
+    python bench_server.py --baseline bench.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import httpx
+
+MCP_PATH = "/mcp"
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+
+
+def _scenarios(tool_args: dict, resource_uri: str) -> Dict[str, Callable[[int], dict]]:
+    return {
+        "tools/list": lambda i: {"jsonrpc": "2.0", "id": i, "method": "tools/list", "params": {}},
+        "tools/call": lambda i: {"jsonrpc": "2.0", "id": i, "method": "tools/call",
+                                 "params": {"name": "first_app_tool", "arguments": tool_args}},
+        "resources/read": lambda i: {"jsonrpc": "2.0", "id": i, "method": "resources/read",
+                                     "params": {"uri": resource_uri}},
+    }
+
+
+def _rpc_result(response: httpx.Response) -> dict:
+    """JSON-RPC message of a response sent either as JSON or as a one-event SSE stream."""
+    response.raise_for_status()
+    if response.headers.get("content-type", "").startswith("text/event-stream"):
+        data = [line[5:].strip() for line in response.text.splitlines() if line.startswith("data:")]
+        message = json.loads(data[-1])
+    else:
+        message = response.json()
+    if "error" in message:
+        raise RuntimeError(f"JSON-RPC error: {message['error']}")
+    return message
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+async def _send(client: httpx.AsyncClient, payload: dict) -> float:
+    start = time.perf_counter()
+    _rpc_result(await client.post(MCP_PATH, json=payload, headers=HEADERS))
+    return time.perf_counter() - start
+
+
+async def run_load(client: httpx.AsyncClient, make_payload: Callable[[int], dict], requests: int,
+                   concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    next_id = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in next_id:
+            try:
+                latencies.append(await _send(client, make_payload(i)))
+            except (httpx.HTTPError, RuntimeError, ValueError):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ms = [x * 1000 for x in latencies]
+    return {
+        "requests": requests,
+        "errors": errors,
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": ms[-1] if ms else 0.0,
+        "mean_ms": statistics.fmean(ms) if ms else 0.0,
+    }
+
+
+async def measure_allocations(client: httpx.AsyncClient, make_payload: Callable[[int], dict],
+                              requests: int) -> dict:
+    """Sequential requests under tracemalloc: median/max peak bytes per request and bytes retained."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for i in range(requests):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await _send(client, make_payload(i))
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - current)
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_requests": requests,
+        "alloc_peak_bytes_p50": statistics.median(peaks) if peaks else 0,
+        "alloc_peak_bytes_max": max(peaks) if peaks else 0,
+        "retained_bytes_per_request": (retained - baseline) / requests if requests else 0.0,
+    }
+
+
+async def run_benchmark(scenarios: List[str], requests: int, concurrency: int, warmup: int,
+                        alloc_requests: int, tool_args: dict) -> dict:
+    import server
+
+    payloads = _scenarios(tool_args, server.TEMPLATE_URI)
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+    # The MCP session manager is started by the app's lifespan, which ASGITransport does not run
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for name in scenarios:
+                make_payload = payloads[name]
+                for i in range(warmup):
+                    await _send(client, make_payload(i))
+                result = await run_load(client, make_payload, requests, concurrency)
+                if alloc_requests:
+                    result.update(await measure_allocations(client, make_payload, alloc_requests))
+                results[name] = result
+    return results
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Human-readable regressions of p95 latency and RPS against a baseline result file."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        if old["p95_ms"] and (current["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 > max_regression:
+            regressions.append(f"{name}: p95 {old['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if old["rps"] and (old["rps"] - current["rps"]) / old["rps"] * 100 > max_regression:
+            regressions.append(f"{name}: rps {old['rps']:.0f} -> {current['rps']:.0f}")
+    return regressions
+
+
+def report(results: dict) -> str:
+    lines = [f"{'scenario':<16}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'alloc KiB':>11}{'errors':>8}"]
+    for name, r in results["scenarios"].items():
+        alloc = r.get("alloc_peak_bytes_p50", 0) / 1024
+        lines.append(f"{name:<16}{r['rps']:>10.0f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+                     f"{alloc:>11.1f}{r['errors']:>8}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenario", action="append", choices=["tools/list", "tools/call", "resources/read"],
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests before each scenario")
+    parser.add_argument("--alloc-requests", type=int, default=100,
+                        help="sequential requests traced for allocations (0 to skip)")
+    parser.add_argument("--city", default="Phoenix")
+    parser.add_argument("--state", default="AZ")
+    parser.add_argument("--cuisine", default="Italian")
+    parser.add_argument("--out", default="bench_server.json", help="result file")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="allowed regression in percent")
+    parser.add_argument("--verbose", action="store_true", help="keep the server's own output")
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenario or ["tools/list", "tools/call", "resources/read"]
+    tool_args = {"city": args.city, "state": args.state, "cuisine": args.cuisine}
+    # first_app_tool prints every result; that output would dominate the measurement
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        scenario_results = asyncio.run(run_benchmark(scenarios, args.requests, args.concurrency, args.warmup,
+                                                     args.alloc_requests, tool_args))
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"requests": args.requests, "concurrency": args.concurrency, "warmup": args.warmup,
+                   "tool_args": tool_args},
+        "scenarios": scenario_results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(report(results))
+    print(f"Results written to {os.path.abspath(args.out)}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
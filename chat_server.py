@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import List
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from restauarant_search_agent import arun_restaurant_agent, batch_search, runtime, stream_restaurant_agent
+
+
+async def _watch_index(interval: float):
+    # Pick up index versions published by index_sync without a restart
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(runtime.reload_if_changed)
+        except Exception as e:
+            print(f"Index reload failed: {e}")
+
+
+async def _sweep_sessions(interval: float):
+    # Evict idle sessions and delete stale spill files even when no request arrives
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(runtime.sessions.sweep)
+        except Exception as e:
+            print(f"Session sweep failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models and index before accepting traffic
+    await asyncio.to_thread(runtime.warmup)
+    print(runtime.startup_report())
+    watcher = asyncio.create_task(_watch_index(float(os.environ.get("INDEX_RELOAD_INTERVAL", 30))))
+    sweeper = asyncio.create_task(_sweep_sessions(float(os.environ.get("SESSION_SWEEP_INTERVAL", 60))))
+    yield
+    watcher.cancel()
+    sweeper.cancel()
+    runtime.save_caches()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Conversation state per session id (bounded, see session_store), unless the agent's checkpointer keeps it
+sessions = runtime.sessions
+
+
+class ChatRequest(BaseModel):
+    session_id: str | None = None
+    message: str
+
+
+@app.post("/chat")
+async def chat(req: ChatRequest):
+    session_id = req.session_id or str(uuid.uuid4())
+
+    # The agent is awaited end to end, so one worker serves many conversations at once
+    if runtime.checkpointer is not None:
+        result = await arun_restaurant_agent(req.message, thread_id=session_id)
+    else:
+        result = await arun_restaurant_agent(req.message, sessions.get(session_id))
+        sessions.put(session_id, result["messages"])
+    response_text = result["messages"][-1].content
+
+    return {"session_id": session_id, "response": response_text}
+
+
+class SearchQuery(BaseModel):
+    city: str
+    cuisine: List[str]
+
+
+# Largest k accepted by /search/batch
+MAX_SEARCH_K = int(os.environ.get("SEARCH_MAX_K", 50))
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchQuery]
+    # FAISS fails on k <= 0, so out-of-range values are a 422 instead of a 500 for the whole batch
+    k: int = Field(5, gt=0, le=MAX_SEARCH_K)
+
+
+@app.post("/search/batch")
+async def search_batch(req: BatchSearchRequest):
+    # Dashboard queries without the conversational layer, embedded in one call
+    results = await asyncio.to_thread(batch_search, [q.model_dump() for q in req.queries], req.k)
+    return {"results": results}
+
+
+@app.get("/stats")
+async def stats():
+    # LLM queue depth / wait times and cache hit rates of the loaded components
+    return runtime.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics of the agent (METRICS=1), including the numeric /stats values."""
+    if runtime.instrumentation.metrics is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled, set METRICS=1")
+    return PlainTextResponse(runtime.instrumentation.render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """Same as /chat, sent as Server-Sent Events while the reply is produced."""
+    session_id = req.session_id or str(uuid.uuid4())
+
+    if runtime.checkpointer is not None:
+        stream = stream_restaurant_agent(req.message, thread_id=session_id)
+    else:
+        stream = stream_restaurant_agent(req.message, sessions.get(session_id))
+
+    async def events():
+        async for event in stream:
+            if event["type"] == "done":
+                if runtime.checkpointer is None:
+                    sessions.put(session_id, event["state"]["messages"])
+                event = {"type": "done", "session_id": session_id,
+                         "response": event["state"]["messages"][-1].content}
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(os.environ.get("PORT", 8007))
+    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,129 @@
+"""Bounded, incrementally rendered conversation history for the extraction prompt.
+
+process_input used to join every message of the session into the prompt, so
+prompt size, token cost and latency all grew with the conversation. The
+prompt now gets
+
+    Known so far: city=New York; cuisine=Italian
+    human: ...
+    ai: ...
+
+with only the last ``max_turns`` exchanges verbatim. Older turns are folded
+into the slot line, which is taken from the slots that process_input records on
+its replies (``additional_kwargs["slots"]``).
+
+The rendered window for a message list is cached under its last message, so
+the next turn reuses it and only renders the messages added since.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+SLOTS_KEY = "slots"
+
+
+def message_slots(message) -> Optional[dict]:
+    return (getattr(message, "additional_kwargs", None) or {}).get(SLOTS_KEY)
+
+
+def _render_line(message) -> str:
+    return f"{message.type}: {message.content}"
+
+
+def _render_slots(slots: Optional[dict]) -> str:
+    if not slots:
+        return ""
+    parts = []
+    if slots.get("city"):
+        parts.append(f"city={slots['city']}")
+    if slots.get("cuisine"):
+        parts.append(f"cuisine={', '.join(slots['cuisine'])}")
+    return f"Known so far: {'; '.join(parts)}" if parts else ""
+
+
+class _Window:
+    __slots__ = ("last", "lines", "slots", "text")
+
+    def __init__(self, last, lines: Tuple[str, ...], slots: Optional[dict]):
+        self.last = last
+        self.lines = lines
+        self.slots = slots
+        self.text = "\n".join(filter(None, [_render_slots(slots), *lines]))
+
+
+class HistoryManager:
+    """Renders the history prefix of a message list in constant time per turn."""
+
+    def __init__(self, max_turns: int = 4, max_cached: int = 1024):
+        self.max_lines = max(1, max_turns) * 2
+        self.max_cached = max_cached
+        self._windows: "OrderedDict[int, _Window]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, message) -> Optional[_Window]:
+        window = self._windows.get(id(message))
+        # The window holds a reference to its message, so a matching id is the same object
+        if window is not None and window.last is message:
+            self._windows.move_to_end(id(message))
+            return window
+        return None
+
+    def render(self, messages: Sequence) -> str:
+        """History text for ``messages`` (the turns before the latest input)."""
+        if not messages:
+            return ""
+        with self._lock:
+            window = self._cached(messages[-1])
+            if window is not None:
+                self.hits += 1
+                return window.text
+
+            # Reuse the window of the previous turn if it is within reach
+            base, start = None, len(messages)
+            for position in range(len(messages) - 1, max(-1, len(messages) - 1 - self.max_lines), -1):
+                base = self._cached(messages[position])
+                if base is not None:
+                    start = position + 1
+                    break
+                start = position
+
+            if base is not None:
+                self.hits += 1
+                lines, slots = base.lines, base.slots
+            else:
+                self.misses += 1
+                lines, slots = (), self._latest_slots(messages[:start])
+
+            new = messages[start:]
+            for message in new:
+                slots = message_slots(message) or slots
+            lines = (lines + tuple(_render_line(m) for m in new))[-self.max_lines:]
+
+            window = _Window(messages[-1], lines, slots)
+            self._windows[id(messages[-1])] = window
+            while len(self._windows) > self.max_cached:
+                self._windows.popitem(last=False)
+            return window.text
+
+    @staticmethod
+    def _latest_slots(messages: Sequence) -> Optional[dict]:
+        for message in reversed(messages):
+            slots = message_slots(message)
+            if slots:
+                return slots
+        return None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "cached_windows": len(self._windows)}
+
+
+def build_history_manager() -> HistoryManager:
+    """HistoryManager configured via HISTORY_TURNS (exchanges kept verbatim)."""
+    return HistoryManager(max_turns=int(os.environ.get("HISTORY_TURNS", 4)))
+
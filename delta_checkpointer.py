@@ -0,0 +1,490 @@
+"""SQLite checkpointer that stores per-step deltas of the conversation state.
+
+Savers that pickle the full checkpoint on every put rewrite the whole,
+growing message list each turn. DeltaSqliteSaver stores:
+
+* the checkpoint without its channel values (ids and versions, small);
+* for each channel changed by the step, either the full value or, when the
+  new value extends the previous list (messages), only the appended items
+  plus a reference to the version they extend. A full snapshot is written
+  every ``snapshot_every`` appends so that a cold read replays a bounded
+  chain.
+
+Values are encoded with the serializer's msgpack format. Writes go to a
+background thread that commits everything queued in one transaction, and
+the latest state of recently used threads is kept in an in-memory LRU, so a
+turn costs O(new messages) regardless of conversation length.
+
+By default put() returns once its transaction is committed; concurrent puts
+still share one commit. With ``durable=False`` (CHECKPOINT_ASYNC=1) it
+returns as soon as the write is queued. That saves the commit wait per step
+but can lose data: turns already reported as saved are gone if the process
+dies before the writer commits them, and write errors only surface on the
+next flush().
+"""
+
+import asyncio
+import os
+import queue
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS channel_values (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    base_version TEXT,
+    type TEXT,
+    data BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    data BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+# kind of a channel_values row
+FULL, APPEND, EMPTY = "full", "append", "empty"
+# Channels that only ever grow, stored as appends to their previous version
+DELTA_CHANNELS = ("messages",)
+
+class _Commit:
+    """Statements written in one transaction; ``done`` is set once they are committed or failed."""
+
+    __slots__ = ("statements", "done", "error")
+
+    def __init__(self, statements: list):
+        self.statements = statements
+        self.done = threading.Event()
+        self.error: Optional[sqlite3.Error] = None
+
+
+class _HotThread:
+    """Latest checkpoint of one (thread, namespace), fully materialized."""
+
+    __slots__ = ("checkpoint_id", "checkpoint", "metadata", "parent_id", "values", "chain", "writes")
+
+    def __init__(self, checkpoint_id, checkpoint, metadata, parent_id, values, chain):
+        self.checkpoint_id = checkpoint_id
+        self.checkpoint = checkpoint
+        self.metadata = metadata
+        self.parent_id = parent_id
+        self.values = values
+        self.chain = chain
+        self.writes: Dict[Tuple[str, int], Tuple[str, str, Any, str]] = {}
+
+
+def _extends(value, previous) -> bool:
+    if not isinstance(value, list) or not isinstance(previous, list) or len(value) < len(previous):
+        return False
+    # Unchanged messages are the same objects between steps, so this is mostly identity checks
+    return all(a is b or a == b for a, b in zip(value, previous))
+
+
+def _config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+class DeltaSqliteSaver(BaseCheckpointSaver):
+    """LangGraph checkpointer on SQLite with delta-encoded channels and a hot-thread LRU."""
+
+    def __init__(self, path: str = "checkpoints.sqlite", hot_threads: int = 1024, snapshot_every: int = 64,
+                 max_batch: int = 512, durable: bool = True, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.hot_threads = hot_threads
+        self.snapshot_every = snapshot_every
+        self.max_batch = max_batch
+        self.durable = durable
+
+        self._hot: "OrderedDict[Tuple[str, str], _HotThread]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._queue: "queue.Queue" = queue.Queue()
+        self.stats_counters = {"puts": 0, "append_rows": 0, "full_rows": 0, "hot_reads": 0, "cold_reads": 0,
+                               "commits": 0, "statements": 0, "failed_commits": 0}
+        self._write_error: Optional[sqlite3.Error] = None
+
+        writer = sqlite3.connect(path, check_same_thread=False)
+        writer.execute("PRAGMA journal_mode=WAL")
+        writer.execute("PRAGMA synchronous=NORMAL")
+        writer.executescript(_SCHEMA)
+        writer.commit()
+        self._writer_conn = writer
+        self._writer = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+        self._writer.start()
+
+    # --- write side --------------------------------------------------------
+
+    def _write_loop(self):
+        while True:
+            commits = [self._queue.get()]
+            while len(commits) < self.max_batch:
+                try:
+                    commits.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            statements = [statement for commit in commits for statement in commit.statements]
+            if statements:
+                try:
+                    # Group commit: one transaction for everything queued meanwhile
+                    with self._writer_conn:
+                        for sql, params in statements:
+                            self._writer_conn.execute(sql, params)
+                    self.stats_counters["commits"] += 1
+                    self.stats_counters["statements"] += len(statements)
+                except sqlite3.Error as e:
+                    print(f"Checkpoint write failed: {e}")
+                    self._write_failed(statements, e)
+                    for commit in commits:
+                        commit.error = e
+            for commit in commits:
+                commit.done.set()
+
+    def _write_failed(self, statements: list, error: sqlite3.Error):
+        """Forget the cached state of threads whose writes were rolled back."""
+        # Every statement's first parameter is its thread_id
+        thread_ids = {params[0] for _, params in statements}
+        with self._lock:
+            for key in [key for key in self._hot if key[0] in thread_ids]:
+                del self._hot[key]
+            if not self.durable:
+                # Nobody waited for these writes, so the next flush() reports the error
+                self._write_error = error
+        self.stats_counters["failed_commits"] += 1
+
+    def _submit(self, statements: list) -> _Commit:
+        commit = _Commit(statements)
+        self._queue.put(commit)
+        return commit
+
+    def _wait(self, commit: _Commit):
+        """Block until ``commit`` is written when the saver is durable; raises its write error."""
+        if self.durable:
+            commit.done.wait()
+            if commit.error is not None:
+                raise commit.error
+
+    def _drain(self, timeout: Optional[float] = None):
+        self._submit([]).done.wait(timeout)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Wait until every queued write is committed.
+
+        Without ``durable`` this raises the last write error since the previous flush.
+        """
+        self._drain(timeout)
+        with self._lock:
+            error, self._write_error = self._write_error, None
+        if error is not None:
+            raise error
+
+    # --- read side ---------------------------------------------------------
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+        return conn
+
+    def _load_value(self, thread_id: str, checkpoint_ns: str, channel: str, version: str) -> Tuple[Any, int, bool]:
+        """(value, append chain length, present) of ``channel`` at ``version``."""
+        tails = []
+        conn = self._reader()
+        while True:
+            row = conn.execute(
+                "SELECT kind, base_version, type, data FROM channel_values "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, version)).fetchone()
+            if row is None or row[0] == EMPTY:
+                return None, 0, False
+            kind, base_version, type_, data = row
+            value = self.serde.loads_typed((type_, data))
+            if kind == FULL:
+                break
+            tails.append(value)
+            version = base_version
+        for tail in reversed(tails):
+            value = value + tail
+        return value, len(tails), True
+
+    def _cold_tuple(self, row) -> Tuple[CheckpointTuple, _HotThread]:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, data, metadata_type, metadata = row
+        checkpoint = self.serde.loads_typed((type_, data))
+        values, chain = {}, {}
+        for channel, version in checkpoint["channel_versions"].items():
+            value, length, present = self._load_value(thread_id, checkpoint_ns, channel, version)
+            if present:
+                values[channel] = value
+                chain[channel] = length
+        metadata = self.serde.loads_typed((metadata_type, metadata))
+        hot = _HotThread(checkpoint_id, checkpoint, metadata, parent_id, values, chain)
+        for task_id, idx, channel, w_type, w_data, task_path in self._reader().execute(
+                "SELECT task_id, idx, channel, type, data, task_path FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id)):
+            hot.writes[(task_id, idx)] = (task_id, channel, self.serde.loads_typed((w_type, w_data)), task_path)
+        self.stats_counters["cold_reads"] += 1
+        return self._tuple(thread_id, checkpoint_ns, hot), hot
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, hot: _HotThread) -> CheckpointTuple:
+        writes = sorted(hot.writes.items(), key=lambda kv: writes_sort_key(kv[1][3], kv[0][0], kv[0][1]))
+        return CheckpointTuple(
+            config=_config(thread_id, checkpoint_ns, hot.checkpoint_id),
+            # Copies, so a node mutating its state cannot corrupt the cached values
+            checkpoint={**hot.checkpoint, "channel_values": {
+                k: list(v) if isinstance(v, list) else v for k, v in hot.values.items()}},
+            metadata=hot.metadata,
+            parent_config=_config(thread_id, checkpoint_ns, hot.parent_id) if hot.parent_id else None,
+            pending_writes=[(task_id, channel, value) for _, (task_id, channel, value, _) in writes],
+        )
+
+    def _remember(self, key: Tuple[str, str], hot: _HotThread):
+        self._hot[key] = hot
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_threads:
+            self._hot.popitem(last=False)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        key = (thread_id, checkpoint_ns)
+        with self._lock:
+            hot = self._hot.get(key)
+            if hot is not None and checkpoint_id in (None, hot.checkpoint_id):
+                self._hot.move_to_end(key)
+                self.stats_counters["hot_reads"] += 1
+                return self._tuple(thread_id, checkpoint_ns, hot)
+
+        # Reads see what is on disk, failed writes included (their threads were dropped from the LRU)
+        self._drain()
+        columns = "thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata"
+        if checkpoint_id:
+            row = self._reader().execute(
+                f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id)).fetchone()
+        else:
+            row = self._reader().execute(
+                f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1", (thread_id, checkpoint_ns)).fetchone()
+        if row is None:
+            return None
+        result, hot = self._cold_tuple(row)
+        if not checkpoint_id:
+            with self._lock:
+                self._remember(key, hot)
+        return result
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        self._drain()
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            where.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        sql = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata "
+               f"FROM checkpoints {'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY checkpoint_id DESC")
+        for row in self._reader().execute(sql, params).fetchall():
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[6], row[7]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._cold_tuple(row)[0]
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_id = config["configurable"].get("checkpoint_id")
+        key = (thread_id, checkpoint_ns)
+        body = checkpoint.copy()
+        values = body.pop("channel_values")
+        metadata = get_checkpoint_metadata(config, metadata)
+
+        statements = []
+        with self._lock:
+            previous = self._hot.get(key)
+            if previous is not None and previous.checkpoint_id != parent_id:
+                previous = None
+            # The checkpoint carries every channel, new_versions only says which ones to write
+            hot_values = {k: list(v) if isinstance(v, list) else v for k, v in values.items()}
+            old_values = previous.values if previous else {}
+            # Without the previous state the chain lengths on disk are unknown, so the next
+            # change of each channel is written in full
+            chain = dict(previous.chain) if previous else dict.fromkeys(values, self.snapshot_every)
+
+            for channel, version in new_versions.items():
+                if channel not in values:
+                    chain.pop(channel, None)
+                    statements.append(("INSERT OR REPLACE INTO channel_values VALUES (?, ?, ?, ?, ?, NULL, NULL, NULL)",
+                                       (thread_id, checkpoint_ns, channel, str(version), EMPTY)))
+                    continue
+                value = values[channel]
+                old = old_values.get(channel)
+                old_version = previous.checkpoint["channel_versions"].get(channel) if previous else None
+                if (channel in DELTA_CHANNELS and old_version is not None
+                        and chain.get(channel, 0) < self.snapshot_every and _extends(value, old)):
+                    type_, data = self.serde.dumps_typed(value[len(old):])
+                    statements.append(("INSERT OR REPLACE INTO channel_values VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                       (thread_id, checkpoint_ns, channel, str(version), APPEND, str(old_version),
+                                        type_, data)))
+                    chain[channel] = chain.get(channel, 0) + 1
+                    self.stats_counters["append_rows"] += 1
+                else:
+                    type_, data = self.serde.dumps_typed(value)
+                    statements.append(("INSERT OR REPLACE INTO channel_values VALUES (?, ?, ?, ?, ?, NULL, ?, ?)",
+                                       (thread_id, checkpoint_ns, channel, str(version), FULL, type_, data)))
+                    chain[channel] = 0
+                    self.stats_counters["full_rows"] += 1
+
+            type_, data = self.serde.dumps_typed(body)
+            metadata_type, metadata_data = self.serde.dumps_typed(metadata)
+            statements.append(("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (thread_id, checkpoint_ns, checkpoint["id"], parent_id, type_, data,
+                                metadata_type, metadata_data)))
+            commit = self._submit(statements)
+            self._remember(key, _HotThread(checkpoint["id"], body, metadata, parent_id, hot_values, chain))
+            self.stats_counters["puts"] += 1
+        self._wait(commit)
+        return _config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        statements = []
+        with self._lock:
+            hot = self._hot.get((thread_id, checkpoint_ns))
+            if hot is not None and hot.checkpoint_id != checkpoint_id:
+                hot = None
+            for idx, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                # Special writes (errors, interrupts) replace, regular ones are kept once
+                verb = "INSERT OR REPLACE" if idx < 0 else "INSERT OR IGNORE"
+                type_, data = self.serde.dumps_typed(value)
+                statements.append((f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type_, data,
+                                    task_path)))
+                if hot is not None and (idx < 0 or (task_id, idx) not in hot.writes):
+                    hot.writes[(task_id, idx)] = (task_id, channel, value, task_path)
+            commit = self._submit(statements)
+        self._wait(commit)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._hot if key[0] == thread_id]:
+                del self._hot[key]
+            commit = self._submit([(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                                   for table in ("checkpoints", "channel_values", "writes")])
+        self._wait(commit)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # --- async: durable writes wait off the event loop, reads use a per-thread connection ---
+
+    async def _awrite(self, method, *args):
+        if self.durable:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with self._lock:
+            key = (config["configurable"]["thread_id"], config["configurable"].get("checkpoint_ns", ""))
+            hot = self._hot.get(key)
+            if hot is not None and get_checkpoint_id(config) in (None, hot.checkpoint_id):
+                return self.get_tuple(config)
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await self._awrite(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await self._awrite(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self._awrite(self.delete_thread, thread_id)
+
+    def stats(self) -> dict:
+        return {**self.stats_counters, "hot_threads": len(self._hot), "queued": self._queue.qsize()}
+
+
+def build_checkpointer() -> Optional[DeltaSqliteSaver]:
+    """DeltaSqliteSaver at CHECKPOINT_DB when CHECKPOINTER=delta, else None (caller keeps history)."""
+    if os.environ.get("CHECKPOINTER") != "delta":
+        return None
+    return DeltaSqliteSaver(
+        os.environ.get("CHECKPOINT_DB", "checkpoints.sqlite"),
+        hot_threads=int(os.environ.get("CHECKPOINT_HOT_THREADS", 1024)),
+        snapshot_every=int(os.environ.get("CHECKPOINT_SNAPSHOT_EVERY", 64)),
+        durable=os.environ.get("CHECKPOINT_ASYNC") != "1",
+    )
@@ -0,0 +1,133 @@
+"""Bounded LRU cache of query embeddings.
+
+search_hotels embeds "Restaurant in <city> with cuisines <cuisines>", and
+that query space is tiny (supported cities x cuisine combinations). Vectors
+are cached under the normalized query text. They can be persisted to an .npz
+file and prewarmed for every city/cuisine pair at startup.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class EmbeddingCache:
+    """LRU of ``embed(text)`` results, keyed on the normalized text.
+
+    ``namespace`` (the model name) is saved with the file, and a file written
+    for another model is ignored.
+    """
+
+    def __init__(self, embed: Callable[[str], List[float]], max_entries: int = 4096, path: Optional[str] = None,
+                 namespace: str = "", embed_batch: Optional[Callable[[List[str]], List[List[float]]]] = None):
+        self.embed = embed
+        self.embed_batch = embed_batch
+        self.max_entries = max_entries
+        self.path = path
+        self.namespace = namespace
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _put(self, key: str, vector: np.ndarray):
+        self._vectors[key] = vector
+        self._vectors.move_to_end(key)
+        while len(self._vectors) > self.max_entries:
+            self._vectors.popitem(last=False)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+        # Computed outside the lock, a concurrent miss on the same text just embeds twice
+        vector = np.asarray(self.embed(text), dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._put(key, vector)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        """One row per text; every text not cached yet is embedded in a single batch call."""
+        keys = [normalize_query(t) for t in texts]
+        with self._lock:
+            found = {}
+            for key in keys:
+                if key in found:
+                    continue
+                found[key] = self._vectors.get(key)
+                if found[key] is not None:
+                    self._vectors.move_to_end(key)
+            self.hits += sum(1 for key in keys if found[key] is not None)
+            self.misses += sum(1 for key in keys if found[key] is None)
+        missing = {key: text for key, text in zip(keys, texts) if found[key] is None}
+        if missing:
+            batch = list(missing.values())
+            vectors = self.embed_batch(batch) if self.embed_batch else [self.embed(t) for t in batch]
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    vector.setflags(write=False)
+                    found[key] = vector
+                    self._put(key, vector)
+        return np.stack([found[key] for key in keys]) if keys else np.empty((0, 0), dtype=np.float32)
+
+    def prewarm(self, texts: Iterable[str], batch_size: int = 64) -> int:
+        """Embed every text not cached yet, in batches when ``embed_batch`` is set."""
+        with self._lock:
+            missing = list(dict.fromkeys(t for t in texts if normalize_query(t) not in self._vectors))
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            vectors = self.embed_batch(batch) if self.embed_batch else [self.embed(t) for t in batch]
+            with self._lock:
+                for text, vector in zip(batch, vectors):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    vector.setflags(write=False)
+                    self._put(normalize_query(text), vector)
+        return len(missing)
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            keys = list(self._vectors)
+            vectors = np.stack(list(self._vectors.values())) if keys else np.empty((0, 0), dtype=np.float32)
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, keys=np.asarray(keys, dtype=str), vectors=vectors, namespace=self.namespace)
+        os.replace(tmp, path)
+
+    def load(self, path: str):
+        try:
+            with np.load(path) as data:
+                if str(data["namespace"]) != self.namespace:
+                    print(f"Ignoring embedding cache {path}: written for another model")
+                    return
+                keys, vectors = list(data["keys"]), data["vectors"]
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Ignoring unreadable embedding cache {path}: {e}")
+            return
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                vector = np.array(vector, dtype=np.float32)
+                vector.setflags(write=False)
+                self._put(str(key), vector)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._vectors)}
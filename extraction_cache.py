@@ -0,0 +1,239 @@
+"""Cache for the city/cuisine extraction done by process_input.
+
+The extraction LLM runs at temperature 0, so the same (history, input) pair
+always yields the same JSON. The cache has two tiers:
+
+* exact: keyed on the normalized (history, input) pair, stored in a memory
+  or SQLite backend with LRU + TTL eviction;
+* semantic (optional): reuses an extraction when the embedding of the input
+  is within ``semantic_distance`` (cosine) of a cached input that was seen
+  with the same history. This tier is always in-process.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").split()).casefold()
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class MemoryBackend:
+    """Bounded in-process LRU with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 10_000, ttl: Optional[float] = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                self.evictions += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SqliteBackend:
+    """Persistent LRU/TTL store shared by every process pointing at the same file."""
+
+    def __init__(self, path: str = "extraction_cache.db", max_entries: int = 100_000, ttl: Optional[float] = 86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extraction_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS extraction_cache_lru ON extraction_cache(last_used)")
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at < now:
+                self._conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+                self.evictions += 1
+                return None
+            self._conn.execute("UPDATE extraction_cache SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key: str, value: dict):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            overflow = len(self) - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM extraction_cache WHERE key IN "
+                    "(SELECT key FROM extraction_cache ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+
+
+class _SemanticTier:
+    """Bounded set of (history, unit input vector, extraction) for nearest-neighbour reuse."""
+
+    def __init__(self, embed: Callable[[str], List[float]], max_distance: float, max_entries: int = 2048):
+        self.embed = embed
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (history_key, input_key) -> (vector, value)
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> np.ndarray:
+        vec = np.asarray(self.embed(text), dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def get(self, history_key: str, text: str) -> Optional[dict]:
+        with self._lock:
+            candidates = [(k, v) for k, v in self._entries.items() if k[0] == history_key]
+        if not candidates:
+            return None
+        query = self._vector(text)
+        matrix = np.stack([vec for _, (vec, _) in candidates])
+        distances = 1.0 - matrix @ query
+        best = int(np.argmin(distances))
+        if distances[best] > self.max_distance:
+            return None
+        key, (_, value) = candidates[best]
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return value
+
+    def set(self, history_key: str, input_key: str, text: str, value: dict):
+        vector = self._vector(text)
+        with self._lock:
+            self._entries[(history_key, input_key)] = (vector, value)
+            self._entries.move_to_end((history_key, input_key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class ExtractionCache:
+    """Exact + optional semantic cache in front of the extraction LLM call."""
+
+    def __init__(self, backend=None, embed: Optional[Callable[[str], List[float]]] = None,
+                 semantic_distance: Optional[float] = None, semantic_max_entries: int = 2048):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.semantic = None
+        if embed is not None and semantic_distance is not None:
+            self.semantic = _SemanticTier(embed, semantic_distance, semantic_max_entries)
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _keys(history: str, latest_input: str):
+        # History is only the turns before the latest input (see _history_and_input),
+        # so it already is the "prior turns" key the semantic tier groups inputs by
+        history_key = _digest(_normalize(history))
+        input_key = _normalize(latest_input)
+        return history_key, input_key
+
+    def get(self, history: str, latest_input: str) -> Optional[dict]:
+        history_key, input_key = self._keys(history, latest_input)
+        value = self.backend.get(_digest(f"{history_key}\x00{input_key}"))
+        if value is not None:
+            self.exact_hits += 1
+            return value
+        if self.semantic is not None:
+            value = self.semantic.get(history_key, latest_input)
+            if value is not None:
+                self.semantic_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, history: str, latest_input: str, extracted: dict):
+        history_key, input_key = self._keys(history, latest_input)
+        self.backend.set(_digest(f"{history_key}\x00{input_key}"), extracted)
+        if self.semantic is not None:
+            self.semantic.set(history_key, input_key, latest_input, extracted)
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "entries": len(self.backend),
+            "evictions": self.backend.evictions,
+        }
+
+
+def build_extraction_cache(embed: Optional[Callable[[str], List[float]]] = None) -> Optional[ExtractionCache]:
+    """Create the cache from EXTRACTION_CACHE* environment variables.
+
+    EXTRACTION_CACHE            memory (default), sqlite or off
+    EXTRACTION_CACHE_PATH       SQLite file, default extraction_cache.db
+    EXTRACTION_CACHE_SIZE       max exact entries
+    EXTRACTION_CACHE_TTL        seconds, 0 disables expiry
+    EXTRACTION_CACHE_SEMANTIC   max cosine distance for the semantic tier, unset disables it
+    """
+    kind = os.environ.get("EXTRACTION_CACHE", "memory").lower()
+    if kind == "off":
+        return None
+
+    ttl = float(os.environ.get("EXTRACTION_CACHE_TTL", 3600)) or None
+    size = int(os.environ.get("EXTRACTION_CACHE_SIZE", 10_000))
+    if kind == "sqlite":
+        backend = SqliteBackend(os.environ.get("EXTRACTION_CACHE_PATH", "extraction_cache.db"), size, ttl)
+    elif kind == "memory":
+        backend = MemoryBackend(size, ttl)
+    else:
+        raise ValueError(f"Unknown EXTRACTION_CACHE backend: {kind}")
+
+    semantic = os.environ.get("EXTRACTION_CACHE_SEMANTIC")
+    return ExtractionCache(backend, embed=embed, semantic_distance=float(semantic) if semantic else None)
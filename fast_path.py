@@ -0,0 +1,138 @@
+"""Rule-based extractor that answers well-formed queries without the LLM.
+
+Inputs such as "Italian in New York" or "japanese food nyc" name a supported
+city and one or more cuisines directly. A token trie built once over the
+city and cuisine aliases scans the input (longest match at every position),
+and the result is only trusted when every remaining token is filler. Anything
+else - follow-ups like "same city", unsupported cities, unknown words - is
+left to the LLM.
+"""
+
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SUPPORTED_CITIES = ["New York", "Los Angeles", "Seattle", "Las Vegas"]
+
+CITY_ALIASES = {
+    "New York": ["new york", "new york city", "nyc", "ny", "manhattan", "big apple"],
+    "Los Angeles": ["los angeles", "la", "l a", "los angeles ca"],
+    # No aliases that are also English words ("sea" in "thai food near the sea")
+    "Seattle": ["seattle"],
+    "Las Vegas": ["las vegas", "vegas", "lv"],
+}
+
+CUISINES = [
+    "American", "Asian", "Barbecue", "Chinese", "French", "Greek", "Indian", "Italian",
+    "Japanese", "Korean", "Mediterranean", "Mexican", "Seafood", "Spanish", "Thai", "Vietnamese",
+]
+
+CUISINE_ALIASES = {
+    "Barbecue": ["bbq", "barbeque"],
+    "Japanese": ["sushi", "ramen"],
+    "Italian": ["pizza", "pasta"],
+    "Mexican": ["tacos", "taco"],
+    "Chinese": ["dim sum"],
+    "Indian": ["curry"],
+}
+
+# Words that may surround entities without changing the meaning of the query
+FILLER_WORDS = {
+    "a", "an", "and", "any", "at", "best", "city", "cuisine", "cuisines", "dinner", "eat", "find",
+    "food", "for", "get", "good", "i", "in", "like", "looking", "lunch", "me", "near", "of", "or",
+    "place", "places", "please", "recommend", "restaurant", "restaurants", "show", "some", "spot",
+    "spots", "the", "to", "want", "with", "would", "s",
+}
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.casefold())
+
+
+class _TokenTrie:
+    """Trie over token sequences mapping aliases to (kind, canonical value)."""
+
+    def __init__(self):
+        self._root: Dict = {}
+
+    def add(self, alias: str, kind: str, value: str):
+        tokens = _tokens(alias)
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[None] = (kind, value)
+
+    def longest_match(self, tokens: List[str], start: int) -> Tuple[int, Optional[Tuple[str, str]]]:
+        node, end, found = self._root, start, None
+        for pos in range(start, len(tokens)):
+            node = node.get(tokens[pos])
+            if node is None:
+                break
+            if None in node:
+                end, found = pos + 1, node[None]
+        return end, found
+
+
+class FastPathExtractor:
+    """Deterministic extractor emitting the same JSON shape as the extraction prompt."""
+
+    def __init__(self, cities: Dict[str, Iterable[str]] = None, cuisines: Iterable[str] = None,
+                 cuisine_aliases: Dict[str, Iterable[str]] = None):
+        self._trie = _TokenTrie()
+        for city, aliases in (cities or CITY_ALIASES).items():
+            self._trie.add(city, "city", city)
+            for alias in aliases:
+                self._trie.add(alias, "city", city)
+        for cuisine in cuisines or CUISINES:
+            self._trie.add(cuisine, "cuisine", cuisine)
+        for cuisine, aliases in (cuisine_aliases or CUISINE_ALIASES).items():
+            for alias in aliases:
+                self._trie.add(alias, "cuisine", cuisine)
+
+        self.hits = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def _scan(self, text: str):
+        """Return (cities, cuisines, unknown tokens) found in text."""
+        tokens = _tokens(text)
+        cities, cuisines, unknown = [], [], []
+        pos = 0
+        while pos < len(tokens):
+            end, found = self._trie.longest_match(tokens, pos)
+            if found is None:
+                # Misspellings are unknown too: a near miss ("vegan" ~ "vegas") is not a confident match
+                if tokens[pos] not in FILLER_WORDS:
+                    unknown.append(tokens[pos])
+                end = pos + 1
+            if found is not None:
+                kind, value = found
+                target = cities if kind == "city" else cuisines
+                if value not in target:
+                    target.append(value)
+            pos = end
+        return cities, cuisines, unknown
+
+    def extract(self, text: str) -> Optional[dict]:
+        """Return the extraction for a confident match, otherwise None."""
+        cities, cuisines, unknown = self._scan(text)
+        # Confident only for exactly one city, at least one cuisine and nothing left over
+        confident = len(cities) == 1 and cuisines and not unknown
+        with self._lock:
+            if confident:
+                self.hits += 1
+            else:
+                self.fallbacks += 1
+        if not confident:
+            return None
+        return {"city": cities[0], "cuisine": cuisines, "response": "Ready to search"}
+
+    def stats(self) -> dict:
+        total = self.hits + self.fallbacks
+        return {
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,170 @@
+"""Streaming, batched and parallel FAISS index builder.
+
+FAISS.from_texts embeds the whole catalog in one call in a single process
+and keeps every text, vector and Document in memory at once. This builder
+streams records from a JSON array or JSONL catalog and embeds them in
+fixed-size batches across a process pool. Vectors are written to a
+memory-mapped float32 file and added to FAISS batch by batch, so embedding
+memory is bounded by the number of batches in flight. The returned store
+still holds one Document per record, as LangChain's FAISS store requires;
+serving reads the compact metadata store instead (see shared_index).
+"""
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def iter_records(path: str, chunk_size: int = 1 << 20) -> Iterator[dict]:
+    """Yield records from a JSONL file or a top-level JSON array without loading it whole."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} is not a JSON array")
+        # Parse in place from ``pos``; consumed text is only dropped when the buffer is refilled
+        pos = 1
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if buffer.startswith("]", pos):
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                more = f.read(chunk_size)
+                if not more:
+                    raise
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+            yield record
+            pos = end
+
+
+def record_text(record: dict) -> str:
+    """Text that is embedded for a catalog record."""
+    if "cuisines" in record:
+        return f"{record['name']} in {record['city']} with cuisines {', '.join(record['cuisines'])}"
+    return (f"{record['name']} in {record['city']} with price ${record['price_per_night']} per night, "
+            f"amenities: {', '.join(record['amenities'])}")
+
+
+def record_metadata(record: dict) -> dict:
+    """Metadata stored alongside a record's vector."""
+    keys = ("id", "name", "city", "cuisines", "price_per_night", "amenities", "rating", "description", "image", "$$")
+    return {k: record[k] for k in keys if k in record}
+
+
+# --- worker side -----------------------------------------------------------
+
+_worker_model = None
+
+
+def _init_worker(model_name: str):
+    global _worker_model
+    # One torch thread per process, parallelism comes from the pool
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    from langchain_huggingface import HuggingFaceEmbeddings
+    _worker_model = HuggingFaceEmbeddings(model_name=model_name)
+
+
+def _embed_batch(texts: List[str]) -> np.ndarray:
+    return np.asarray(_worker_model.embed_documents(texts), dtype=np.float32)
+
+
+# --- driver side -----------------------------------------------------------
+
+def _batches(records: Iterator[dict], batch_size: int):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_vectorstore(catalog_file: str, embedding_model, batch_size: int = 256, workers: Optional[int] = None,
+                      vectors_file: Optional[str] = None, model_name: str = DEFAULT_MODEL) -> FAISS:
+    """Embed every record of ``catalog_file`` and return a LangChain FAISS store.
+
+    ``embedding_model`` is used for queries and, when ``workers`` <= 1, for the
+    build itself. With more workers each pool process loads ``model_name``.
+    Vectors are also kept in ``vectors_file`` (float32, row per record).
+    """
+    workers = os.cpu_count() if workers is None else workers
+    total = sum(1 for _ in iter_records(catalog_file))
+    if total <= batch_size * workers:
+        # Too small to amortize loading the model in every pool process
+        workers = 1
+    vectors_file = vectors_file or f"{catalog_file}.vectors.f32"
+    print(f"Indexing {total} records from {catalog_file} in batches of {batch_size} on {max(workers, 1)} worker(s)...")
+
+    index = None
+    vectors = None
+    docstore = {}
+    index_to_docstore_id = {}
+    done = 0
+    start = time.perf_counter()
+
+    def consume(batch, embedded):
+        nonlocal index, vectors, done
+        if index is None:
+            dim = embedded.shape[1]
+            index = faiss.IndexFlatL2(dim)
+            vectors = np.memmap(vectors_file, dtype=np.float32, mode="w+", shape=(max(total, 1), dim))
+        rows = slice(done, done + len(batch))
+        vectors[rows] = embedded
+        index.add(vectors[rows])
+        for offset, record in enumerate(batch):
+            doc_id = str(record.get("id", done + offset))
+            docstore[doc_id] = Document(page_content=record_text(record), metadata=record_metadata(record))
+            index_to_docstore_id[done + offset] = doc_id
+        done += len(batch)
+        elapsed = time.perf_counter() - start
+        print(f"Indexed {done}/{total} ({done / elapsed:.0f} records/s)")
+
+    batches = _batches(iter_records(catalog_file), batch_size)
+    if workers <= 1:
+        for batch in batches:
+            embedded = np.asarray(embedding_model.embed_documents([record_text(r) for r in batch]), dtype=np.float32)
+            consume(batch, embedded)
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(model_name,)) as pool:
+            # Bounded window of batches in flight, consumed in submission order
+            pending = []
+            for batch in batches:
+                pending.append((batch, pool.submit(_embed_batch, [record_text(r) for r in batch])))
+                if len(pending) >= workers * 2:
+                    ready_batch, future = pending.pop(0)
+                    consume(ready_batch, future.result())
+            for ready_batch, future in pending:
+                consume(ready_batch, future.result())
+
+    if vectors is not None:
+        vectors.flush()
+    if index is None:
+        raise ValueError(f"{catalog_file} contains no records")
+    return FAISS(embedding_model, index, InMemoryDocstore(docstore), index_to_docstore_id)
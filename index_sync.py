@@ -0,0 +1,197 @@
+"""Incremental synchronisation of the FAISS store with the catalog file.
+
+A manifest maps every record ID to the docstore ID of its vector and a hash
+of the text and metadata that were indexed. A sync streams the catalog,
+re-embeds only new or changed records, removes deleted ones by ID, and saves
+the result as a new index version.
+
+Versions live next to the index as ``<index_file>.v<generation>`` and
+``index_file`` itself is a symlink that is swapped with os.replace. A reader
+therefore sees either the old or the new index, never a half-written one,
+and a running server can hot-swap by watching where the link points.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+from index_builder import iter_records, record_metadata, record_text
+from shared_index import write_shared_metadata
+from vector_index import apply_search_params, build_index
+
+MANIFEST_NAME = "manifest.json"
+
+
+def content_hash(text: str, metadata: dict) -> str:
+    payload = json.dumps({"text": text, "metadata": metadata}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _record_id(record: dict, position: int) -> str:
+    return str(record.get("id", position))
+
+
+def load_manifest(index_file: str) -> Optional[dict]:
+    path = os.path.join(index_file, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def manifest_from_vectorstore(vectorstore: FAISS) -> dict:
+    """Reconstruct a manifest for an index saved before manifests existed."""
+    records = {}
+    for doc_id in vectorstore.index_to_docstore_id.values():
+        doc = vectorstore.docstore.search(doc_id)
+        record_id = str(doc.metadata.get("id", doc_id))
+        records[record_id] = {"doc_id": doc_id, "hash": content_hash(doc.page_content, doc.metadata)}
+    return {"generation": 0, "records": records}
+
+
+def manifest_from_catalog(catalog_file: str, vectorstore: FAISS) -> dict:
+    """Manifest for a store freshly built from ``catalog_file`` by index_builder."""
+    records = {}
+    for position, record in enumerate(iter_records(catalog_file)):
+        record_id = _record_id(record, position)
+        records[record_id] = {
+            "doc_id": record_id,
+            "hash": content_hash(record_text(record), record_metadata(record)),
+        }
+    return {"generation": 0, "records": records}
+
+
+def diff_catalog(catalog_file: str, manifest: dict) -> Tuple[List[Tuple[str, dict]], List[str], int]:
+    """Return (records to (re-)embed, record IDs to remove, unchanged count)."""
+    known = manifest["records"]
+    changed, seen, unchanged = [], set(), 0
+    for position, record in enumerate(iter_records(catalog_file)):
+        record_id = _record_id(record, position)
+        seen.add(record_id)
+        entry = known.get(record_id)
+        if entry is not None and entry["hash"] == content_hash(record_text(record), record_metadata(record)):
+            unchanged += 1
+        else:
+            changed.append((record_id, record))
+    removed = [record_id for record_id in known if record_id not in seen]
+    return changed, removed, unchanged
+
+
+def sync_vectorstore(vectorstore: FAISS, catalog_file: str, manifest: dict, embedding_model,
+                     batch_size: int = 256) -> Tuple[dict, Dict[str, int]]:
+    """Apply catalog changes to ``vectorstore`` in place and return (new manifest, counts)."""
+    changed, removed, unchanged = diff_catalog(catalog_file, manifest)
+    records = dict(manifest["records"])
+
+    # Changed records are removed and re-added, so their vector gets a new position
+    stale = [records[rid]["doc_id"] for rid, _ in changed if rid in records]
+    stale += [records[rid]["doc_id"] for rid in removed]
+    if stale:
+        vectorstore.delete(ids=stale)
+    for rid in removed:
+        del records[rid]
+
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start:start + batch_size]
+        texts = [record_text(record) for _, record in batch]
+        metadatas = [record_metadata(record) for _, record in batch]
+        vectors = embedding_model.embed_documents(texts)
+        ids = [rid for rid, _ in batch]
+        vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+        for rid, text, metadata in zip(ids, texts, metadatas):
+            records[rid] = {"doc_id": rid, "hash": content_hash(text, metadata)}
+
+    counts = {"added_or_updated": len(changed), "removed": len(removed), "unchanged": unchanged}
+    return dict(manifest, records=records), counts
+
+
+def save_vectorstore(vectorstore: FAISS, index_file: str, manifest: dict, keep: int = 2) -> str:
+    """Write a new index version with its manifest and atomically point ``index_file`` at it."""
+    manifest = dict(manifest, generation=manifest.get("generation", 0) + 1)
+    index_file = os.path.abspath(index_file)
+    version_dir = f"{index_file}.v{manifest['generation']}"
+    if os.path.exists(version_dir):
+        shutil.rmtree(version_dir)
+    vectorstore.save_local(version_dir)
+    write_shared_metadata(vectorstore, version_dir)
+    with open(os.path.join(version_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f)
+
+    if os.path.isdir(index_file) and not os.path.islink(index_file):
+        # One-time migration of an index saved in place before versioning
+        os.rename(index_file, f"{index_file}.v0")
+    tmp_link = f"{index_file}.link.tmp"
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(os.path.basename(version_dir), tmp_link)
+    os.replace(tmp_link, index_file)
+
+    _prune_versions(index_file, manifest["generation"], keep)
+    return version_dir
+
+
+def _prune_versions(index_file: str, generation: int, keep: int):
+    # Keep the previous version(s): running servers may still be reading them
+    parent, name = os.path.split(index_file)
+    for entry in os.listdir(parent):
+        if entry.startswith(f"{name}.v") and entry[len(name) + 2:].isdigit():
+            if int(entry[len(name) + 2:]) <= generation - keep:
+                shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def _flat_copy(index: faiss.Index) -> faiss.Index:
+    """Flat index holding the (decoded) vectors of ``index`` at the same positions."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    flat = faiss.IndexFlat(index.d, index.metric_type)
+    if index.ntotal:
+        flat.add(index.reconstruct_n(0, index.ntotal))
+    return flat
+
+
+def sync_index(vectorstore: FAISS, catalog_file: str, index_file: str,
+               embedding_model) -> Tuple[Dict[str, int], Optional[str]]:
+    """Sync ``vectorstore`` with ``catalog_file``; returns (counts, new version dir or None if unchanged).
+
+    Removing vectors only renumbers the remaining ones in a flat index, and
+    HNSW cannot remove them at all. A compressed index is therefore synced as
+    a flat copy of its vectors and rebuilt with the same type and search
+    parameters afterwards. Nothing is re-embedded except the changed records.
+    """
+    manifest = load_manifest(index_file) or manifest_from_vectorstore(vectorstore)
+    settings = manifest.get("index")
+    compressed = vectorstore.index
+    if settings and settings["type"] != "flat":
+        vectorstore.index = _flat_copy(compressed)
+
+    manifest, counts = sync_vectorstore(vectorstore, catalog_file, manifest, embedding_model)
+    print(f"Index sync: {counts}")
+    if not (counts["added_or_updated"] or counts["removed"]):
+        vectorstore.index = compressed
+        return counts, None
+
+    if settings and settings["type"] != "flat":
+        flat = vectorstore.index
+        vectors = flat.reconstruct_n(0, flat.ntotal)
+        rebuilt = build_index(vectors, settings["type"], metric=flat.metric_type)
+        apply_search_params(rebuilt, **settings["search_params"])
+        vectorstore.index = rebuilt
+    return counts, save_vectorstore(vectorstore, index_file, manifest)
+
+
+if __name__ == "__main__":
+    # Offline job: python index_sync.py [catalog_file] [index_file]
+    from restauarant_search_agent import load_embedding_model
+
+    catalog = sys.argv[1] if len(sys.argv) > 1 else "hotels.json"
+    index = sys.argv[2] if len(sys.argv) > 2 else "hotel_index.faiss"
+    model = load_embedding_model()
+    store = FAISS.load_local(index, model, allow_dangerous_deserialization=True)
+    sync_index(store, catalog, index, model)
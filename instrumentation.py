@@ -0,0 +1,326 @@
+"""Per-turn and per-node metrics and traces for the agent graph.
+
+Enabled with METRICS=1 and/or TRACING=otel; when both are off every hook is
+a flag check and nothing is recorded.
+
+Metrics (Prometheus text format, served by chat_server at /metrics):
+
+    agent_turn_seconds                      graph run wall time
+    agent_node_seconds{node}                node wall time
+    agent_llm_calls_total{node}             chat model calls
+    agent_llm_tokens_total{node,type}       prompt / completion tokens
+    agent_operation_seconds{operation}      embed_query, faiss_search
+    agent_retrieval_candidates              rows scored per search
+    agent_cache_requests_total{cache,result}
+    agent_component_stat{component,stat}    numeric runtime.stats() values
+
+Turn and node timings and token counts come from a LangGraph callback
+handler. Retrieval and cache hooks are explicit calls in the agent.
+TRACING=otel emits one span per turn, node and operation through the
+OpenTelemetry API. The exporter is whatever the process configured; with
+only opentelemetry-api installed the spans are no-ops.
+"""
+
+import contextvars
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (1, 10, 100, 1000, 10000, 100000)
+
+# Span of the node being run; node code runs in a copy of the context the node's start event was handled in
+_NODE_SPAN: contextvars.ContextVar = contextvars.ContextVar("agent_node_span", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by name and labels, rendered as Prometheus text."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = SECONDS_BUCKETS, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def render(self, gauges: Optional[Dict[str, Dict[tuple, float]]] = None) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_labels_text(labels)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        le = _labels_text(labels + (("le", repr(float(bound))),))
+                        lines.append(f"{name}_bucket{le} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels_text(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_labels_text(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{_labels_text(labels)} {histogram.count}")
+        for name, series in sorted((gauges or {}).items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_labels_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class _Operation:
+    """Timer (and span) around one operation; record() adds span attributes."""
+
+    __slots__ = ("instrumentation", "name", "span", "start")
+
+    def __init__(self, instrumentation: "Instrumentation", name: str):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.span = None
+
+    def __enter__(self):
+        if self.instrumentation.tracer is not None:
+            self.span = self.instrumentation.start_span(self.name, _NODE_SPAN.get())
+        self.start = time.perf_counter()
+        return self
+
+    def record(self, **attributes):
+        if self.span is not None:
+            self.span.set_attributes(attributes)
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if self.instrumentation.metrics is not None:
+            self.instrumentation.metrics.observe("agent_operation_seconds", elapsed, operation=self.name)
+        if self.span is not None:
+            if exc is not None:
+                self.span.record_exception(exc)
+            self.span.end()
+        return False
+
+
+class _NoOperation:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def record(self, **attributes):
+        pass
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_OPERATION = _NoOperation()
+
+
+class Instrumentation:
+    """Recording surface used by the agent; all methods are cheap no-ops when disabled."""
+
+    def __init__(self, metrics: bool = False, tracer=None,
+                 component_stats: Optional[Callable[[], Dict[str, dict]]] = None):
+        self.metrics = MetricsRegistry() if metrics else None
+        self.tracer = tracer
+        self.enabled = self.metrics is not None or tracer is not None
+        self.component_stats = component_stats
+        self.callback = GraphCallbackHandler(self) if self.enabled else None
+        if self.metrics is not None:
+            for name, help_text in (
+                ("agent_turn_seconds", "Wall time of one agent turn"),
+                ("agent_node_seconds", "Wall time of one graph node run"),
+                ("agent_llm_calls_total", "Chat model calls"),
+                ("agent_llm_tokens_total", "Chat model tokens by type (prompt, completion)"),
+                ("agent_operation_seconds", "Wall time of embedding and FAISS operations"),
+                ("agent_retrieval_candidates", "Rows scored by one filtered search"),
+                ("agent_cache_requests_total", "Cache lookups by cache and result (hit, miss)"),
+                ("agent_component_stat", "Numeric stats() values of the loaded runtime components"),
+            ):
+                self.metrics.describe(name, help_text)
+
+    def start_span(self, name: str, parent=None, attributes: Optional[dict] = None):
+        from opentelemetry import trace
+        context = trace.set_span_in_context(parent) if parent is not None else None
+        return self.tracer.start_span(name, context=context, attributes=attributes)
+
+    def operation(self, name: str):
+        """Context manager timing ``name`` (and tracing it as a span)."""
+        return _Operation(self, name) if self.enabled else _NO_OPERATION
+
+    def cache(self, cache: str, hit: bool):
+        if self.metrics is not None:
+            self.metrics.inc("agent_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+    def candidates(self, count: int):
+        if self.metrics is not None:
+            self.metrics.observe("agent_retrieval_candidates", count, buckets=COUNT_BUCKETS)
+
+    def config(self, config: Optional[dict] = None) -> Optional[dict]:
+        """``config`` with the graph callback added, unchanged when disabled."""
+        if self.callback is None:
+            return config
+        config = dict(config or {})
+        config["callbacks"] = [*(config.get("callbacks") or []), self.callback]
+        return config
+
+    def render_metrics(self) -> str:
+        if self.metrics is None:
+            return ""
+        gauges = {}
+        if self.component_stats is not None:
+            series = {}
+            for component, values in self.component_stats().items():
+                for stat, value in values.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+                        series[(("component", component), ("stat", stat))] = value
+            gauges["agent_component_stat"] = series
+        return self.metrics.render(gauges)
+
+
+class GraphCallbackHandler(BaseCallbackHandler):
+    """Turn, node and LLM metrics (and spans) from the callback events of a graph run."""
+
+    run_inline = True
+
+    def __init__(self, instrumentation: Instrumentation):
+        self.instrumentation = instrumentation
+        self._lock = threading.Lock()
+        # run_id -> (kind, name, start, span)
+        self._runs: Dict[Any, tuple] = {}
+        self._llm_nodes: Dict[Any, str] = {}
+
+    def _start(self, run_id, parent_run_id, kind: str, name: str, attributes: dict):
+        span = None
+        if self.instrumentation.tracer is not None:
+            with self._lock:
+                parent = self._runs.get(parent_run_id)
+            span = self.instrumentation.start_span(f"node {name}" if kind == "node" else "agent turn",
+                                                   parent[3] if parent else None, attributes)
+            if kind == "node":
+                # Operations inside the node (embedding, FAISS) become its children
+                _NODE_SPAN.set(span)
+        with self._lock:
+            self._runs[run_id] = (kind, name, time.perf_counter(), span)
+
+    def _end(self, run_id, error: Optional[BaseException] = None):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        kind, name, start, span = run
+        elapsed = time.perf_counter() - start
+        metrics = self.instrumentation.metrics
+        if metrics is not None:
+            if kind == "turn":
+                metrics.observe("agent_turn_seconds", elapsed)
+            else:
+                metrics.observe("agent_node_seconds", elapsed, node=name)
+        if span is not None:
+            if error is not None:
+                span.record_exception(error)
+            span.end()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None,
+                       **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if parent_run_id is None:
+            self._start(run_id, None, "turn", kwargs.get("name") or "graph", {})
+        elif (node is not None and kwargs.get("name") == node
+              and any(tag.startswith("graph:step:") for tag in tags or ())):
+            # The run the graph starts for the node, not the runnables inside it
+            self._start(run_id, parent_run_id, "node", node, {"langgraph.node": node})
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node", "")
+        with self._lock:
+            self._llm_nodes[run_id] = node
+        if self.instrumentation.metrics is not None:
+            self.instrumentation.metrics.inc("agent_llm_calls_total", node=node)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            node = self._llm_nodes.pop(run_id, "")
+        metrics = self.instrumentation.metrics
+        if metrics is None:
+            return
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or usage
+        if usage:
+            metrics.inc("agent_llm_tokens_total", usage.get("input_tokens", 0), node=node, type="prompt")
+            metrics.inc("agent_llm_tokens_total", usage.get("output_tokens", 0), node=node, type="completion")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._llm_nodes.pop(run_id, None)
+
+
+def build_instrumentation(component_stats: Optional[Callable[[], Dict[str, dict]]] = None) -> Instrumentation:
+    """Instrumentation configured via METRICS=1 and TRACING=otel."""
+    tracer = None
+    if os.environ.get("TRACING", "").lower() == "otel":
+        try:
+            from opentelemetry import trace
+            tracer = trace.get_tracer("restaurant-agent")
+        except ImportError:
+            print("TRACING=otel needs the opentelemetry-api package, tracing disabled")
+    return Instrumentation(metrics=os.environ.get("METRICS") == "1", tracer=tracer, component_stats=component_stats)
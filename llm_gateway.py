@@ -0,0 +1,258 @@
+"""Shared, concurrency-limited access to the chat model.
+
+One ChatOllama per process with a keep-alive HTTP pool, wrapped in LLMGateway:
+
+* at most ``max_concurrency`` requests in flight, the rest wait in a queue;
+* every request has a deadline (``timeout`` seconds, queue wait included);
+* connection failures are retried ``max_retries`` times with backoff;
+* with ``batch_window`` > 0, async requests arriving within that window are
+  sent as one ``abatch`` call (for backends that batch server side). A batch
+  still takes one slot per request, since ``abatch`` on a model without
+  server-side batching (ChatOllama) sends one request per item;
+* stats() reports queue depth, in-flight requests and wait times.
+
+The gateway is a Runnable, so ``prompt | gateway`` chains and streaming work
+unchanged.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, List, Optional
+
+import httpx
+from langchain_core.runnables import Runnable, RunnableConfig
+
+RETRYABLE_ERRORS = (ConnectionError, httpx.TransportError)
+
+
+def build_ollama(model: str = "mistral", base_url: Optional[str] = None, timeout: float = 60.0,
+                 pool_size: int = 8):
+    """ChatOllama whose sync and async clients keep ``pool_size`` connections alive."""
+    from langchain_ollama import ChatOllama
+
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size, keepalive_expiry=60.0)
+    kwargs = {"model": model, "temperature": 0,
+              "client_kwargs": {"timeout": httpx.Timeout(timeout, connect=5.0), "limits": limits}}
+    if base_url:
+        kwargs["base_url"] = base_url
+    return ChatOllama(**kwargs)
+
+
+class LLMGateway(Runnable):
+    """Concurrency cap, deadlines, retries and optional micro-batching around a chat model.
+
+    Sync and async callers are limited separately, each to ``max_concurrency``.
+    """
+
+    def __init__(self, llm, max_concurrency: int = 4, timeout: float = 60.0, max_retries: int = 2,
+                 batch_window: float = 0.0, max_batch: int = 8):
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.batch_window = batch_window
+        # A batch holds one slot per request, so it can never be larger than the cap
+        self.max_batch = max(1, min(max_batch, max_concurrency))
+
+        self._sync_slots = threading.BoundedSemaphore(max_concurrency)
+        self._async_slots: Optional[asyncio.Semaphore] = None
+        self._batch_lock: Optional[asyncio.Lock] = None
+        self._async_loop = None
+        self._pending: List[tuple] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self._stats_lock = threading.Lock()
+        self._queued = 0
+        self._started = 0
+        self._in_flight = 0
+        self._counters = {"requests": 0, "timeouts": 0, "retries": 0, "errors": 0, "batches": 0,
+                          "batched_requests": 0, "max_queue_depth": 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # --- metrics -----------------------------------------------------------
+
+    def _enqueue(self):
+        with self._stats_lock:
+            self._queued += 1
+            self._counters["requests"] += 1
+            self._counters["max_queue_depth"] = max(self._counters["max_queue_depth"], self._queued)
+
+    def _dequeue(self, waited: float, started: bool):
+        with self._stats_lock:
+            self._queued -= 1
+            if started:
+                self._started += 1
+                self._in_flight += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+    def _finish(self, count: int = 1):
+        with self._stats_lock:
+            self._in_flight -= count
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self._counters[name] += n
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queued,
+                "in_flight": self._in_flight,
+                **self._counters,
+                "wait_ms_avg": self._wait_total * 1000 / self._started if self._started else 0.0,
+                "wait_ms_max": self._wait_max * 1000,
+            }
+
+    # --- sync --------------------------------------------------------------
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any):
+        deadline = time.monotonic() + self.timeout
+        self._enqueue()
+        start = time.monotonic()
+        acquired = self._sync_slots.acquire(timeout=self.timeout)
+        self._dequeue(time.monotonic() - start, acquired)
+        if not acquired:
+            self._count("timeouts")
+            raise TimeoutError(f"LLM request waited more than {self.timeout}s for a free slot")
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    # The HTTP client timeout bounds each attempt
+                    return self.llm.invoke(input, config, **kwargs)
+                except RETRYABLE_ERRORS:
+                    if attempt == self.max_retries or time.monotonic() >= deadline:
+                        self._count("errors")
+                        raise
+                    self._count("retries")
+                    time.sleep(min(0.5 * 2 ** attempt, max(0.0, deadline - time.monotonic())))
+        finally:
+            self._sync_slots.release()
+            self._finish()
+
+    # --- async -------------------------------------------------------------
+
+    def _slots(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one event loop
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+            self._batch_lock = asyncio.Lock()
+            self._async_loop = loop
+        return self._async_slots
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any):
+        deadline = time.monotonic() + self.timeout
+        if self.batch_window > 0 and not kwargs:
+            return await self._ainvoke_batched(input, config, deadline)
+
+        self._enqueue()
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots().acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._dequeue(time.monotonic() - start, False)
+            self._count("timeouts")
+            raise TimeoutError(f"LLM request waited more than {self.timeout}s for a free slot")
+        self._dequeue(time.monotonic() - start, True)
+        try:
+            return await self._call_with_retries(lambda: self.llm.ainvoke(input, config, **kwargs), deadline)
+        finally:
+            self._slots().release()
+            self._finish()
+
+    async def _call_with_retries(self, call, deadline: float, count_timeout: bool = True):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await asyncio.wait_for(call(), max(0.001, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                if count_timeout:
+                    self._count("timeouts")
+                raise TimeoutError(f"LLM request exceeded its {self.timeout}s deadline")
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries or time.monotonic() >= deadline:
+                    self._count("errors")
+                    raise
+                self._count("retries")
+                await asyncio.sleep(min(0.5 * 2 ** attempt, max(0.0, deadline - time.monotonic())))
+
+    async def _ainvoke_batched(self, input: Any, config: Optional[RunnableConfig], deadline: float):
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue()
+        self._pending.append((input, config, future, time.monotonic()))
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), max(0.001, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self._count("timeouts")
+            raise TimeoutError(f"LLM request exceeded its {self.timeout}s deadline")
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.batch_window)
+        self._flush_task = None
+        self._flush_now()
+
+    def _flush_now(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[tuple]):
+        slots = self._slots()
+        # Batches collect their slots one at a time under a lock, so two partly filled batches
+        # cannot wait on each other; single requests never hold more than one slot
+        async with self._batch_lock:
+            for _ in batch:
+                await slots.acquire()
+        now = time.monotonic()
+        for _, _, _, queued_at in batch:
+            self._dequeue(now - queued_at, True)
+        self._count("batches")
+        self._count("batched_requests", len(batch))
+        try:
+            results = await self._call_with_retries(
+                lambda: self.llm.abatch([item[0] for item in batch], [item[1] or {} for item in batch],
+                                        return_exceptions=True),
+                now + self.timeout, count_timeout=False)
+        except Exception as e:
+            results = [e] * len(batch)
+        finally:
+            for _ in batch:
+                slots.release()
+            self._finish(len(batch))
+        for (_, _, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def build_llm_gateway() -> LLMGateway:
+    """Gateway over Ollama configured via OLLAMA_MODEL, OLLAMA_BASE_URL and LLM_* variables."""
+    timeout = float(os.environ.get("LLM_TIMEOUT", 60))
+    max_concurrency = int(os.environ.get("LLM_MAX_CONCURRENCY", 4))
+    llm = build_ollama(
+        model=os.environ.get("OLLAMA_MODEL", "mistral"),
+        base_url=os.environ.get("OLLAMA_BASE_URL"),
+        timeout=timeout,
+        pool_size=max_concurrency * 2,
+    )
+    return LLMGateway(
+        llm,
+        max_concurrency=max_concurrency,
+        timeout=timeout,
+        max_retries=int(os.environ.get("LLM_MAX_RETRIES", 2)),
+        batch_window=float(os.environ.get("LLM_BATCH_WINDOW_MS", 0)) / 1000,
+        max_batch=int(os.environ.get("LLM_MAX_BATCH", 8)),
+    )
@@ -0,0 +1,283 @@
+"""Compact metadata stores keyed by integer FAISS vector ID.
+
+Serving no longer unpickles LangChain's docstore (one Document object per
+restaurant, loaded with allow_dangerous_deserialization). The metadata of
+vector ``i`` is read directly from one of:
+
+* ColumnarMetadataStore: one .npy file per column, memory-mappable. City and
+  cuisine strings are interned (small integer codes plus a vocabulary), lists
+  use offsets + codes, and free text uses offsets + a UTF-8 byte blob.
+* SqliteMetadataStore: a single SQLite table with vector_id as primary key.
+
+Both expose ``len()``, ``store[i] -> dict`` and ``postings()`` for the
+retriever.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+COLUMNAR_DIR = "metadata"
+SQLITE_NAME = "metadata.sqlite"
+
+# Interned string columns, interned list columns, free text, and numbers
+CODED_COLUMNS = ("city",)
+CODED_LIST_COLUMNS = ("cuisines", "amenities")
+# "$$" is the catalog's price range ("$" to "$$$$")
+TEXT_COLUMNS = ("id", "name", "description", "image", "$$")
+INT_COLUMNS = ("price_per_night",)
+FLOAT_COLUMNS = ("rating",)
+
+_INT_MISSING = np.iinfo(np.int32).min
+
+
+def _key(value: str) -> str:
+    return " ".join((value or "").split()).casefold()
+
+
+def _group_ids(codes: np.ndarray, num_values: int) -> List[np.ndarray]:
+    """Sorted row IDs for every code in ``codes``."""
+    if num_values == 0:
+        # np.split would return one group holding every row
+        return []
+    order = np.argsort(codes, kind="stable").astype(np.int64)
+    bounds = np.cumsum(np.bincount(codes, minlength=num_values))[:-1]
+    return np.split(order, bounds)
+
+
+def _code_dtype(num_values: int):
+    return np.uint16 if num_values < 2 ** 16 else np.uint32
+
+
+# --- columnar --------------------------------------------------------------
+
+def write_columnar(metadatas: Iterable[dict], index_dir: str):
+    """Write metadata rows, in vector-ID order, as a columnar store in ``index_dir``."""
+    vocab = {name: {} for name in CODED_COLUMNS + CODED_LIST_COLUMNS}
+    coded = {name: [] for name in CODED_COLUMNS}
+    lists = {name: ([0], []) for name in CODED_LIST_COLUMNS}
+    texts = {name: ([0], bytearray()) for name in TEXT_COLUMNS}
+    ints = {name: [] for name in INT_COLUMNS}
+    floats = {name: [] for name in FLOAT_COLUMNS}
+
+    for meta in metadatas:
+        for name in CODED_COLUMNS:
+            coded[name].append(vocab[name].setdefault(meta.get(name) or "", len(vocab[name])))
+        for name in CODED_LIST_COLUMNS:
+            offsets, codes = lists[name]
+            codes.extend(vocab[name].setdefault(item, len(vocab[name])) for item in meta.get(name) or [])
+            offsets.append(len(codes))
+        for name in TEXT_COLUMNS:
+            offsets, data = texts[name]
+            value = meta.get(name)
+            data += b"" if value is None else str(value).encode("utf-8")
+            offsets.append(len(data))
+        for name in INT_COLUMNS:
+            ints[name].append(_INT_MISSING if meta.get(name) is None else meta[name])
+        for name in FLOAT_COLUMNS:
+            floats[name].append(np.nan if meta.get(name) is None else meta[name])
+
+    target = os.path.join(index_dir, COLUMNAR_DIR)
+    tmp = f"{target}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    def save(name, array):
+        np.save(os.path.join(tmp, f"{name}.npy"), array)
+
+    for name in CODED_COLUMNS:
+        save(name, np.asarray(coded[name], dtype=_code_dtype(len(vocab[name]))))
+    for name in CODED_LIST_COLUMNS:
+        offsets, codes = lists[name]
+        save(f"{name}.offsets", np.asarray(offsets, dtype=np.int64))
+        save(f"{name}.codes", np.asarray(codes, dtype=_code_dtype(len(vocab[name]))))
+    for name in TEXT_COLUMNS:
+        offsets, data = texts[name]
+        save(f"{name}.offsets", np.asarray(offsets, dtype=np.int64))
+        save(f"{name}.data", np.frombuffer(bytes(data), dtype=np.uint8))
+    for name in INT_COLUMNS:
+        save(name, np.asarray(ints[name], dtype=np.int32))
+    for name in FLOAT_COLUMNS:
+        save(name, np.asarray(floats[name], dtype=np.float64))
+    with open(os.path.join(tmp, "vocab.json"), "w") as f:
+        json.dump({name: list(values) for name, values in vocab.items()}, f)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+
+
+class ColumnarMetadataStore(Sequence):
+    """Columnar metadata, optionally memory-mapped so workers share the pages."""
+
+    def __init__(self, path: str, mmap: bool = True):
+        mode = "r" if mmap else None
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+
+        with open(os.path.join(path, "vocab.json")) as f:
+            self.vocab = json.load(f)
+        self._coded = {name: load(name) for name in CODED_COLUMNS}
+        self._lists = {name: (load(f"{name}.offsets"), load(f"{name}.codes")) for name in CODED_LIST_COLUMNS}
+        # Stores written before a text column was added simply lack it
+        self._texts = {name: (load(f"{name}.offsets"), load(f"{name}.data")) for name in TEXT_COLUMNS
+                       if os.path.exists(os.path.join(path, f"{name}.offsets.npy"))}
+        self._ints = {name: load(name) for name in INT_COLUMNS}
+        self._floats = {name: load(name) for name in FLOAT_COLUMNS}
+        self._len = len(self._coded[CODED_COLUMNS[0]])
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        return os.path.exists(os.path.join(index_dir, COLUMNAR_DIR, "vocab.json"))
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i: int) -> dict:
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        meta = {}
+        for name, codes in self._coded.items():
+            value = self.vocab[name][codes[i]]
+            if value:
+                meta[name] = value
+        for name, (offsets, codes) in self._lists.items():
+            start, end = offsets[i], offsets[i + 1]
+            if end > start:
+                meta[name] = [self.vocab[name][c] for c in codes[start:end]]
+        for name, (offsets, data) in self._texts.items():
+            start, end = offsets[i], offsets[i + 1]
+            if end > start:
+                meta[name] = data[start:end].tobytes().decode("utf-8")
+        for name, values in self._ints.items():
+            if values[i] != _INT_MISSING:
+                meta[name] = int(values[i])
+        for name, values in self._floats.items():
+            if not np.isnan(values[i]):
+                meta[name] = float(values[i])
+        return meta
+
+    def postings(self) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """(city -> vector IDs, cuisine -> vector IDs), keyed case-insensitively."""
+        cities = {}
+        for code, ids in enumerate(_group_ids(self._coded["city"], len(self.vocab["city"]))):
+            cities.setdefault(_key(self.vocab["city"][code]), []).append(ids)
+
+        offsets, codes = self._lists["cuisines"]
+        cuisines = {}
+        # A catalog without cuisines (e.g. the generated hotels) has no postings for them
+        if len(self.vocab["cuisines"]) and len(codes):
+            rows = np.repeat(np.arange(self._len, dtype=np.int64), np.diff(offsets))
+            for code, positions in enumerate(_group_ids(codes, len(self.vocab["cuisines"]))):
+                cuisines.setdefault(_key(self.vocab["cuisines"][code]), []).append(rows[positions])
+
+        def merge(groups):
+            return {k: np.unique(np.concatenate(v)) for k, v in groups.items()}
+        return merge(cities), merge(cuisines)
+
+
+# --- sqlite ----------------------------------------------------------------
+
+_SQL_COLUMNS = CODED_COLUMNS + CODED_LIST_COLUMNS + TEXT_COLUMNS + INT_COLUMNS + FLOAT_COLUMNS
+
+
+def _sql_names(columns: Sequence[str]) -> str:
+    # Quoted, since "$$" is not a valid bare identifier
+    return ", ".join(f'"{name}"' for name in columns)
+
+
+def write_sqlite(metadatas: Iterable[dict], index_dir: str):
+    """Write metadata rows, in vector-ID order, to ``index_dir``/metadata.sqlite."""
+    target = os.path.join(index_dir, SQLITE_NAME)
+    tmp = f"{target}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    conn.execute(f"CREATE TABLE metadata (vector_id INTEGER PRIMARY KEY, {_sql_names(_SQL_COLUMNS)})")
+    placeholders = ", ".join("?" * (len(_SQL_COLUMNS) + 1))
+
+    def rows():
+        for vector_id, meta in enumerate(metadatas):
+            yield (vector_id, *[
+                json.dumps(meta[name]) if name in CODED_LIST_COLUMNS and name in meta else meta.get(name)
+                for name in _SQL_COLUMNS
+            ])
+
+    conn.executemany(f"INSERT INTO metadata VALUES ({placeholders})", rows())
+    conn.commit()
+    conn.close()
+    os.replace(tmp, target)
+
+
+class SqliteMetadataStore(Sequence):
+    """Metadata rows read on demand from SQLite, opened read-only."""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._len = self._conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+        # Stores written before a column was added simply lack it
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(metadata)")}
+        self._columns = [name for name in _SQL_COLUMNS if name in existing]
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        return os.path.exists(os.path.join(index_dir, SQLITE_NAME))
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i: int) -> dict:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_sql_names(self._columns)} FROM metadata WHERE vector_id = ?", (int(i),)
+            ).fetchone()
+        if row is None:
+            raise IndexError(i)
+        meta = {}
+        for name, value in zip(self._columns, row):
+            if value is not None and value != "":
+                meta[name] = json.loads(value) if name in CODED_LIST_COLUMNS else value
+        return meta
+
+    def postings(self) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        cities: Dict[str, List[int]] = {}
+        cuisines: Dict[str, List[int]] = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT vector_id, city, cuisines FROM metadata ORDER BY vector_id").fetchall()
+        for vector_id, city, cuisine_json in rows:
+            cities.setdefault(_key(city), []).append(vector_id)
+            for cuisine in json.loads(cuisine_json) if cuisine_json else []:
+                cuisines.setdefault(_key(cuisine), []).append(vector_id)
+        return ({k: np.asarray(v, dtype=np.int64) for k, v in cities.items()},
+                {k: np.unique(np.asarray(v, dtype=np.int64)) for k, v in cuisines.items()})
+
+
+# --- selection -------------------------------------------------------------
+
+def write_metadata_store(metadatas: Sequence[dict], index_dir: str, kind: str = None):
+    """Write the configured store (METADATA_STORE: columnar or sqlite) next to the index."""
+    kind = kind or os.environ.get("METADATA_STORE", "columnar")
+    if kind == "sqlite":
+        write_sqlite(metadatas, index_dir)
+    elif kind == "columnar":
+        write_columnar(metadatas, index_dir)
+    else:
+        raise ValueError(f"Unknown METADATA_STORE: {kind}")
+
+
+def open_metadata_store(index_dir: str, mmap: bool = True):
+    if ColumnarMetadataStore.exists(index_dir):
+        return ColumnarMetadataStore(os.path.join(index_dir, COLUMNAR_DIR), mmap=mmap)
+    if SqliteMetadataStore.exists(index_dir):
+        return SqliteMetadataStore(os.path.join(index_dir, SQLITE_NAME))
+    raise FileNotFoundError(f"No metadata store in {index_dir}")
+
+
+def has_metadata_store(index_dir: str) -> bool:
+    return ColumnarMetadataStore.exists(index_dir) or SqliteMetadataStore.exists(index_dir)
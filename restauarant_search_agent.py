@@ -1,21 +1,47 @@
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, BaseMessage
 from langchain_community.vectorstores import FAISS
-from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+from langgraph.config import get_stream_writer
+from langgraph.constants import TAG_NOSTREAM
 from langgraph.graph import StateGraph, END, add_messages
+import numpy as np
+import asyncio
 import random
+import threading
+import time
 import uuid
 import json
 import os
-from typing import List, TypedDict, Annotated
+from typing import AsyncIterator, Dict, List, Optional, TypedDict, Annotated
 import re
 import json
 
+from conversation_history import SLOTS_KEY, build_history_manager
+from delta_checkpointer import build_checkpointer
+from extraction_cache import build_extraction_cache
+from embedding_cache import EmbeddingCache
+from fast_path import CUISINES, SUPPORTED_CITIES, FastPathExtractor
+from llm_gateway import build_llm_gateway
+from metadata_store import open_metadata_store
+from index_builder import build_vectorstore
+from index_sync import load_manifest, manifest_from_catalog, save_vectorstore, sync_index
+from instrumentation import build_instrumentation
+from result_renderer import RENDERERS, RENDER_MODES, structured_restaurants
+from retrieval import PartitionedRetriever
+from session_store import build_session_store
+from shared_index import SharedIndex, write_shared_metadata
+from single_flight import SingleFlight, normalize_key
+from vector_index import apply_search_params, compress_vectorstore
+
 
 # Define AgentState using TypedDict
 class AgentState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
+    # Slots extracted by process_input; search_hotels runs only when both are set
+    city: Optional[str]
+    cuisine: Optional[List[str]]
+    results: List[dict]
 
 
 # Generate fake hotel data
@@ -35,37 +61,73 @@ def generate_fake_hotels(num_hotels=1000):
     return hotels
 
 
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def load_embedding_model():
+    # Imported here: pulling in sentence-transformers alone takes seconds
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+
 # Load or create FAISS vector store
-def load_or_create_vectorstore(hotels_file="hotels.json", index_file="hotel_index.faiss"):
-    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+def load_or_create_vectorstore(hotels_file="hotels.json", index_file="hotel_index.faiss", embedding_model=None,
+                               index_type=None):
+    """Load the store, or build it from the catalog.
+
+    index_type (default INDEX_TYPE, "flat") selects a compressed index when
+    building: ivf_flat, ivf_pq, hnsw or sq8. Its tuned nprobe/efSearch are kept
+    in the manifest and re-applied on load.
+
+    This returns the LangChain store with its pickled docstore, which only the
+    index writer (build, INDEX_SYNC) needs. Serving opens SharedIndex instead.
+    """
+    if embedding_model is None:
+        embedding_model = load_embedding_model()
+    index_type = index_type or os.environ.get("INDEX_TYPE", "flat")
 
     if os.path.exists(index_file) and os.path.exists(hotels_file):
         print("Loading existing vector store...")
         vectorstore = FAISS.load_local(index_file, embedding_model, allow_dangerous_deserialization=True)
-        with open(hotels_file, "r") as f:
-            hotels = json.load(f)
-        return vectorstore, hotels
+        index_settings = (load_manifest(index_file) or {}).get("index")
+        if index_settings:
+            apply_search_params(vectorstore.index, **index_settings["search_params"])
+        if os.environ.get("INDEX_SYNC") == "1":
+            # Re-embed only records that changed since the index was written
+            sync_index(vectorstore, hotels_file, index_file, embedding_model)
+        if not SharedIndex.exists(index_file):
+            # Index saved before the metadata store existed: add it in place
+            write_shared_metadata(vectorstore, os.path.realpath(index_file))
+        return vectorstore, open_metadata_store(os.path.realpath(index_file))
+
+    if not os.path.exists(hotels_file):
+        print("Generating fake catalog...")
+        with open(hotels_file, "w") as f:
+            json.dump(generate_fake_hotels(), f)
 
     print("Creating new vector store...")
-    hotels = generate_fake_hotels()
-    texts = [
-        f"{h['name']} in {h['city']} with price ${h['price_per_night']} per night, amenities: {', '.join(h['amenities'])}"
-        for h in hotels
-    ]
-    metadatas = [
-        {"id": h["id"], "city": h["city"], "price_per_night": h["price_per_night"], "amenities": h["amenities"]} for h
-        in hotels]
-    vectorstore = FAISS.from_texts(texts, embedding_model, metadatas=metadatas)
-
-    vectorstore.save_local(index_file)
-    with open(hotels_file, "w") as f:
-        json.dump(hotels, f)
+    vectors_file = f"{hotels_file}.vectors.f32"
+    vectorstore = build_vectorstore(
+        hotels_file,
+        embedding_model,
+        batch_size=int(os.environ.get("INDEX_BATCH_SIZE", 256)),
+        workers=int(os.environ.get("INDEX_WORKERS", os.cpu_count() or 1)),
+        vectors_file=vectors_file,
+    )
+    manifest = manifest_from_catalog(hotels_file, vectorstore)
+    if index_type != "flat":
+        vectors = np.memmap(vectors_file, dtype=np.float32, mode="r").reshape(-1, vectorstore.index.d)
+        manifest["index"] = compress_vectorstore(
+            vectorstore,
+            vectors,
+            index_type,
+            target_recall=float(os.environ.get("INDEX_TARGET_RECALL", 0.95)),
+        )
+    save_vectorstore(vectorstore, index_file, manifest)
+
+    # Compact, memory-mapped rows rather than a second in-memory copy of the catalog
+    return vectorstore, open_metadata_store(os.path.realpath(index_file))
 
-    return vectorstore, hotels
-
-
-# Initialize Mistral LLM
-llm = ChatOllama(model="mistral", temperature=0)
 
 # Prompt for extracting city, price range, and amenities
 extract_prompt = ChatPromptTemplate.from_messages([
@@ -96,6 +158,12 @@ extract_prompt = ChatPromptTemplate.from_messages([
     ("user", "{input}")
 ])
 
+# How search results are turned into the reply: "template" and "jinja" render
+# locally, "llm" sends them through result_prompt
+RESULT_RENDERER = os.environ.get("RESULT_RENDERER", "template")
+if RESULT_RENDERER not in RENDER_MODES:
+    raise ValueError(f"Unknown RESULT_RENDERER: {RESULT_RENDERER}")
+
 # Prompt for formatting search results
 result_prompt = ChatPromptTemplate.from_messages([
     ("system", """Format the restaurant search results into a user-friendly response. If no restaurants are found, return: "No restaurants found matching your criteria." 
@@ -105,89 +173,509 @@ result_prompt = ChatPromptTemplate.from_messages([
 ])
 
 
-# Node to process user input with Mistral LLM
-def process_input(state: List[HumanMessage | AIMessage]) -> List[HumanMessage | AIMessage]:
-    history = "\n".join([f"{msg.type}: {msg.content}" for msg in state])
-    latest_input = state[-1].content if state else ""
+def _history_and_input(state: AgentState):
+    messages = state["messages"]
+    # Slot summary plus the last few turns, rendered incrementally
+    history = runtime.history.render(messages[:-1])
+    latest_input = messages[-1].content if messages else ""
+    return history, latest_input
+
+
+def _parse_extraction(content: str) -> dict:
+    print(f"Raw LLM output: {content}")  # Debugging
+    extracted = json.loads(content.strip())  # Strip whitespace
+    if not all(key in extracted for key in ["city", "cuisine", "response"]):
+        raise ValueError("Missing required JSON keys")
+    return extracted
+
+
+def _extraction_error(e: Exception) -> dict:
+    print(f"Error parsing LLM output: {e}")  # Debugging
+    return {
+        "messages": [AIMessage(
+            content=f"Sorry, I couldn't process your request due to an error: {str(e)}. Please try again with a clear format (e.g., 'Hotel in Paris', '$100-$200', 'pool, wifi').")],
+        "city": None,
+        "cuisine": None,
+        "results": [],
+    }
 
-    chain = extract_prompt | llm
+
+def _apply_extraction(extracted: dict) -> dict:
+    city, cuisine = extracted["city"], extracted["cuisine"]
+    if city and cuisine:
+        # Complete slots ("Ready to search") go straight to search_hotels, which writes the reply
+        return {"city": city, "cuisine": cuisine, "results": []}
+
+    # Recorded on the reply so the history window can drop old turns without losing them
+    slots = {"city": city, "cuisine": cuisine}
+    return {
+        "messages": [AIMessage(content=extracted["response"], additional_kwargs={SLOTS_KEY: slots})],
+        "city": city,
+        "cuisine": cuisine,
+        # With a checkpointer the previous turn's results would otherwise persist
+        "results": [],
+    }
+
+
+def _fast_extraction(latest_input: str) -> Optional[dict]:
+    if not runtime.fast_path:
+        return None
+    extracted = runtime.fast_path.extract(latest_input)
+    runtime.instrumentation.cache("fast_path", hit=extracted is not None)
+    return extracted
+
+
+def _cached_extraction(history: str, latest_input: str) -> Optional[dict]:
+    if not runtime.extraction_cache:
+        return None
+    extracted = runtime.extraction_cache.get(history, latest_input)
+    runtime.instrumentation.cache("extraction", hit=extracted is not None)
+    return extracted
+
+
+def _extraction_chain():
+    # The raw extraction JSON is never streamed to the user
+    return (extract_prompt | runtime.llm).with_config(tags=[TAG_NOSTREAM])
+
+
+def _store_extraction(history: str, latest_input: str, extracted: dict) -> dict:
+    if runtime.extraction_cache:
+        runtime.extraction_cache.put(history, latest_input, extracted)
+    return _apply_extraction(extracted)
+
+
+# Node to process user input with Mistral LLM; the sync and async nodes differ only in how they wait
+def process_input(state: AgentState) -> dict:
+    history, latest_input = _history_and_input(state)
+    extracted = _fast_extraction(latest_input) or _cached_extraction(history, latest_input)
+    if extracted is not None:
+        return _apply_extraction(extracted)
     try:
-        result = chain.invoke({"history": history, "input": latest_input})
-        print(f"Raw LLM output: {result.content}")  # Debugging
-        extracted = json.loads(result.content.strip())  # Strip whitespace
-        if not all(key in extracted for key in ["city", "cuisine", "response"]):
-            raise ValueError("Missing required JSON keys")
+        result = _extraction_chain().invoke({"history": history, "input": latest_input})
+        extracted = _parse_extraction(result.content)
     except Exception as e:
-        print(f"Error parsing LLM output: {e}")  # Debugging
-        return state + [AIMessage(
-            content=f"Sorry, I couldn't process your request due to an error: {str(e)}. Please try again with a clear format (e.g., 'Hotel in Paris', '$100-$200', 'pool, wifi').")]
-
-    response = extracted["response"]
-    if response == "Ready to search":
-        search_params = {
-            "city": extracted["city"],
-            "cuisine": extracted["cuisine"],
-        }
-        return state + [AIMessage(content=f"Search: {json.dumps(search_params)}")]
+        return _extraction_error(e)
+    return _store_extraction(history, latest_input, extracted)
+
 
-    return state + [AIMessage(content=response)]
+async def aprocess_input(state: AgentState) -> dict:
+    history, latest_input = _history_and_input(state)
+    # A semantic-tier miss embeds the input and the SQLite backend reads disk, so keep the cache off the loop
+    extracted = (_fast_extraction(latest_input)
+                 or await asyncio.to_thread(_cached_extraction, history, latest_input))
+    if extracted is not None:
+        return _apply_extraction(extracted)
+    try:
+        result = await _extraction_chain().ainvoke({"history": history, "input": latest_input})
+        extracted = _parse_extraction(result.content)
+    except Exception as e:
+        return _extraction_error(e)
+    return await asyncio.to_thread(_store_extraction, history, latest_input, extracted)
 
 
-# Node to search hotels
-def search_hotels(state: List[HumanMessage | AIMessage]) -> List[HumanMessage | AIMessage]:
-    last_message = state[-1].content
-    if not last_message.startswith("Search:"):
-        return state
+def _route_after_input(state: AgentState) -> str:
+    """Search only when process_input filled both slots, otherwise its reply ends the turn."""
+    return "search_hotels" if state.get("city") and state.get("cuisine") else END
 
-    try:
-        params = json.loads(last_message.replace("Search: ", ""))
-        city = params["city"]
-        cuisine = params["cuisine"]
-    except:
-        return state + [AIMessage(content="Error processing search parameters.")]
 
-    query = f"Restaurant in {city} with cuisines {cuisine}"
+def _query_text(city, cuisine) -> str:
+    return f"Restaurant in {city} with cuisines {cuisine}"
+
+
+def _search_query(city, cuisine) -> str:
+    query = _query_text(city, cuisine)
     print(f"Search query: {query}")
-    results = vectorstore.similarity_search_with_score(query, k=5)
+    return query
 
-    filtered_hotels = [
-        doc.metadata for doc, score in results
-        if doc.metadata["city"] == city
-           and all(cuisine in doc.metadata["cuisines"] for cuisine in cuisine)
-    ]
 
-    chain = result_prompt | llm
-    result = chain.invoke({"results": filtered_hotels})
+def _retrieve(city, cuisine, k=5) -> list:
+    """Embed the query and search only rows matching the city and every cuisine."""
+    query = _search_query(city, cuisine)
+    instrumentation = runtime.instrumentation
+    with instrumentation.operation("embed_query"):
+        vector = runtime.query_embeddings.embed_query(query)
+    with instrumentation.operation("faiss_search") as operation:
+        result = runtime.retriever.search(vector, city, cuisine, k=k)
+        operation.record(candidates=result.candidates_scored, results=len(result.rows))
+    instrumentation.candidates(result.candidates_scored)
+    print(f"Scored {result.candidates_scored} candidates, {len(result.rows)} results")
+    return result.rows
 
-    return state + [AIMessage(content=result.content)]
 
+def _emit_restaurants(restaurants: List[dict]):
+    # Streaming clients get the cards before the reply text is rendered (no-op otherwise)
+    get_stream_writer()({"restaurants": restaurants})
 
-# Initialize or load vector store
-vectorstore, hotels = load_or_create_vectorstore()
 
-# Define LangGraph workflow
-workflow = StateGraph(List[HumanMessage | AIMessage])
-workflow.add_node("process_input", process_input)
-workflow.add_node("search_hotels", search_hotels)
-workflow.add_edge("process_input", "search_hotels")
-workflow.add_edge("search_hotels", END)
-workflow.set_entry_point("process_input")
-app = workflow.compile()
+def batch_search(queries: List[dict], k: int = 5) -> List[dict]:
+    """Semantic search for many {"city", "cuisine"} queries in one pass.
+
+    Repeated queries are searched once, and the query texts missing from the
+    embedding cache are embedded in a single vectorized call.
+    """
+    queries = [dict(q, cuisine=[q["cuisine"]] if isinstance(q.get("cuisine"), str) else q.get("cuisine"))
+               for q in queries]
+    keys = [normalize_key(q.get("city"), q.get("cuisine")) for q in queries]
+    unique = dict(zip(reversed(keys), reversed(queries)))
+    vectors = runtime.query_embeddings.embed_queries(
+        [_query_text(q["city"], q["cuisine"]) for q in unique.values()])
+    restaurants = {
+        key: structured_restaurants(runtime.retriever.search(vector, q["city"], q["cuisine"], k=k).rows)
+        for (key, q), vector in zip(unique.items(), vectors)
+    }
+    return [{"query": {"city": q["city"], "cuisine": q["cuisine"]}, "restaurants": restaurants[key]}
+            for q, key in zip(queries, keys)]
+
+
+def _search_reply(state: AgentState, restaurants: List[dict], content: str, message_id: str = None) -> dict:
+    slots = {"city": state["city"], "cuisine": state["cuisine"]}
+    # Reusing the id of an LLM reply keeps the stream from sending its text twice
+    reply = AIMessage(content=content, id=message_id,
+                      additional_kwargs={"restaurants": restaurants, SLOTS_KEY: slots})
+    return {"messages": [reply], "results": restaurants}
+
+
+def _run_search(city, cuisine):
+    """(restaurants, reply text, LLM message id) for one search."""
+    filtered_hotels = _retrieve(city, cuisine)
+
+    restaurants = structured_restaurants(filtered_hotels)
+    _emit_restaurants(restaurants)
+    if RESULT_RENDERER == "llm":
+        chain = result_prompt | runtime.llm
+        result = chain.invoke({"results": filtered_hotels})
+        return restaurants, result.content, result.id
+
+    return restaurants, RENDERERS[RESULT_RENDERER](restaurants), None
+
 
+async def _arun_search(city, cuisine):
+    # Embedding + FAISS search are CPU bound, keep them off the event loop
+    filtered_hotels = await asyncio.to_thread(_retrieve, city, cuisine)
 
-# Function to run the agent
-def run_hotel_agent(user_input: str, state: List[HumanMessage | AIMessage] = None):
-    if state is None:
-        state = [HumanMessage(content=user_input)]
-    else:
-        state = state + [HumanMessage(content=user_input)]
+    restaurants = structured_restaurants(filtered_hotels)
+    _emit_restaurants(restaurants)
+    if RESULT_RENDERER == "llm":
+        chain = result_prompt | runtime.llm
+        result = await chain.ainvoke({"results": filtered_hotels})
+        return restaurants, result.content, result.id
 
-    return app.invoke(state)
+    return restaurants, RENDERERS[RESULT_RENDERER](restaurants), None
+
+
+def _shared_search_reply(state: AgentState, result, leader: bool) -> dict:
+    restaurants, content, message_id = result
+    if not leader:
+        # Cards of a coalesced or cached search were streamed to the leader only
+        _emit_restaurants(restaurants)
+        message_id = None
+    return _search_reply(state, restaurants, content, message_id)
+
+
+# Node to search hotels
+def search_hotels(state: AgentState) -> dict:
+    city, cuisine = state["city"], state["cuisine"]
+    ran = []
+
+    def compute():
+        ran.append(True)
+        return _run_search(city, cuisine)
+
+    # Identical concurrent searches share one retrieval + rendering, then a short TTL cache
+    result = runtime.search_flight.do(normalize_key(city, cuisine), compute)
+    runtime.instrumentation.cache("search", hit=not ran)
+    return _shared_search_reply(state, result, bool(ran))
+
+
+async def asearch_hotels(state: AgentState) -> dict:
+    city, cuisine = state["city"], state["cuisine"]
+    ran = []
+
+    async def compute():
+        ran.append(True)
+        return await _arun_search(city, cuisine)
+
+    result = await runtime.search_flight.ado(normalize_key(city, cuisine), compute)
+    runtime.instrumentation.cache("search", hit=not ran)
+    return _shared_search_reply(state, result, bool(ran))
+
+
+# Define LangGraph workflow
+def build_workflow():
+    workflow = StateGraph(AgentState)
+    # Each node carries a sync and an async implementation, so the same compiled
+    # graph serves app.invoke (CLI) and app.ainvoke (async servers)
+    workflow.add_node("process_input", RunnableLambda(process_input, afunc=aprocess_input))
+    workflow.add_node("search_hotels", RunnableLambda(search_hotels, afunc=asearch_hotels))
+    workflow.add_conditional_edges("process_input", _route_after_input, ["search_hotels", END])
+    workflow.add_edge("search_hotels", END)
+    workflow.set_entry_point("process_input")
+    return workflow
+
+
+_MISSING = object()
+
+
+class AgentRuntime:
+    """Heavy agent dependencies, each built on first use.
+
+    Importing this module no longer loads the embedding model, the FAISS index
+    or the LLM client. Servers call warmup() at startup to pay that cost before
+    the first request; startup_profile records the time of every phase,
+    excluding the phases it triggered.
+    """
+
+    def __init__(self, hotels_file="hotels.json", index_file="hotel_index.faiss"):
+        self.hotels_file = hotels_file
+        self.index_file = index_file
+        self.startup_profile: Dict[str, float] = {}
+        self._components = {}
+        self._lock = threading.RLock()
+        self._child_time = 0.0
+        self._index_version = None
+
+    def _get(self, name, factory):
+        value = self._components.get(name, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            if name not in self._components:
+                outer_child_time, self._child_time = self._child_time, 0.0
+                start = time.perf_counter()
+                self._components[name] = factory()
+                elapsed = time.perf_counter() - start
+                self.startup_profile[name] = elapsed - self._child_time
+                self._child_time = outer_child_time + elapsed
+            return self._components[name]
+
+    @property
+    def llm(self):
+        # Pooled ChatOllama behind a concurrency limit with deadlines, configured via LLM_*
+        return self._get("llm", build_llm_gateway)
+
+    @property
+    def embeddings(self):
+        return self._get("embeddings", load_embedding_model)
+
+    @property
+    def query_embeddings(self):
+        # LRU of search query vectors, size EMBEDDING_CACHE_SIZE, persisted to EMBEDDING_CACHE_PATH if set
+        return self._get("query_embeddings", lambda: EmbeddingCache(
+            lambda text: self.embeddings.embed_query(text),
+            max_entries=int(os.environ.get("EMBEDDING_CACHE_SIZE", 4096)),
+            path=os.environ.get("EMBEDDING_CACHE_PATH"),
+            namespace=EMBEDDING_MODEL,
+            # MiniLM embeds queries and documents the same way, so prewarming can batch
+            embed_batch=lambda texts: self.embeddings.embed_documents(texts),
+        ))
+
+    def _prewarm_query_embeddings(self) -> int:
+        texts = [_query_text(city, [cuisine]) for city in SUPPORTED_CITIES for cuisine in CUISINES]
+        added = self.query_embeddings.prewarm(texts)
+        self.query_embeddings.save()
+        return added
+
+    @property
+    def vectorstore(self):
+        return self._store[0]
+
+    @property
+    def hotels(self):
+        return self._store[1]
+
+    @property
+    def _store(self):
+        return self._get("vectorstore", self._load_store)
+
+    def _load_store(self):
+        if os.environ.get("INDEX_SYNC") == "1":
+            # Syncing edits the LangChain docstore, so this path still unpickles it
+            store = load_or_create_vectorstore(self.hotels_file, self.index_file, embedding_model=self.embeddings)
+            # A build or a sync with changes saves a new version, so resolve the link after it
+            self._index_version = os.path.realpath(self.index_file)
+            return store
+        if not SharedIndex.exists(self.index_file):
+            # Builds the index, or adds the metadata store to an older one
+            load_or_create_vectorstore(self.hotels_file, self.index_file, embedding_model=self.embeddings)
+
+        # Raw FAISS index plus the metadata store keyed by vector ID, no pickle.
+        # SHARED_INDEX=1 memory-maps both so all workers share them via the page cache.
+        print("Opening vector store...")
+        shared = SharedIndex.open(self.index_file, mmap=os.environ.get("SHARED_INDEX") == "1")
+        index_settings = (load_manifest(self.index_file) or {}).get("index")
+        if index_settings:
+            apply_search_params(shared.index, **index_settings["search_params"])
+        self._index_version = shared.path
+        return shared, shared.metadata
+
+    def reload_if_changed(self) -> bool:
+        """Hot-swap to a newer index version written by index_sync, if there is one."""
+        if "vectorstore" not in self._components:
+            return False
+        if os.path.realpath(self.index_file) == self._index_version:
+            return False
+        store = self._load_store()
+        retriever = self._build_retriever(store[0])
+        with self._lock:
+            self._components["vectorstore"] = store
+            self._components["retriever"] = retriever
+        # Cached results came from the previous index
+        self.search_flight.clear()
+        print(f"Switched to index {self._index_version}")
+        return True
+
+    @property
+    def retriever(self):
+        # City-partitioned, cuisine-prefiltered search over the same FAISS vectors
+        return self._get("retriever", lambda: self._build_retriever(self.vectorstore))
+
+    @staticmethod
+    def _build_retriever(store):
+        if isinstance(store, SharedIndex):
+            # No per-city copies of a memory-mapped index: they would be private to this worker
+            return PartitionedRetriever(store.index, store.metadata, partition_by_city=False if store.mmap else None)
+        return PartitionedRetriever.from_vectorstore(store)
+
+    @property
+    def extraction_cache(self):
+        # Exact/semantic cache for the extraction LLM call, configured via EXTRACTION_CACHE*
+        return self._get("extraction_cache", lambda: build_extraction_cache(
+            embed=lambda text: self.embeddings.embed_query(text)))
+
+    @property
+    def search_flight(self):
+        # Coalesces identical concurrent searches, results kept SEARCH_CACHE_TTL seconds
+        return self._get("search_flight", lambda: SingleFlight(ttl=float(os.environ.get("SEARCH_CACHE_TTL", 30))))
+
+    @property
+    def history(self):
+        # Bounded history window for the extraction prompt, size via HISTORY_TURNS
+        return self._get("history", build_history_manager)
+
+    @property
+    def fast_path(self):
+        # Rule-based extractor tried before the LLM, disable with FAST_PATH=0
+        return self._get("fast_path", lambda: FastPathExtractor() if os.environ.get("FAST_PATH", "1") != "0" else None)
+
+    @property
+    def instrumentation(self):
+        # Per-node metrics (METRICS=1) and OpenTelemetry spans (TRACING=otel), no-op otherwise
+        return self._get("instrumentation", lambda: build_instrumentation(component_stats=self.stats))
+
+    @property
+    def sessions(self):
+        # Message lists of conversations without a checkpointer, bounded via SESSION_*
+        return self._get("sessions", build_session_store)
+
+    @property
+    def checkpointer(self):
+        # Conversation state kept per thread_id (delta-encoded SQLite), enable with CHECKPOINTER=delta
+        return self._get("checkpointer", build_checkpointer)
+
+    @property
+    def app(self):
+        return self._get("graph", lambda: build_workflow().compile(checkpointer=self.checkpointer))
+
+    def warmup(self):
+        """Load every component and run one embedding so the first request pays nothing."""
+        for name in ("llm", "embeddings", "vectorstore", "retriever", "extraction_cache", "history", "fast_path",
+                     "checkpointer", "instrumentation", "app"):
+            getattr(self, name)
+        self._get("embedding_warmup", lambda: self.embeddings.embed_query("warmup"))
+        if os.environ.get("EMBEDDING_CACHE_PREWARM", "1") != "0":
+            # Every single-cuisine query for the supported cities
+            self._get("query_prewarm", self._prewarm_query_embeddings)
+        return self
+
+    def save_caches(self):
+        """Persist caches that outlive the process (query embeddings), if they were loaded."""
+        if "query_embeddings" in self._components:
+            self.query_embeddings.save()
+        if self._components.get("checkpointer") is not None:
+            self.checkpointer.flush()
+
+    def stats(self) -> Dict[str, dict]:
+        """stats() of every loaded component that has one (llm gateway, caches, ...)."""
+        return {name: component.stats() for name, component in list(self._components.items())
+                if hasattr(component, "stats")}
+
+    def startup_report(self) -> str:
+        lines = ["Startup profile:"]
+        for phase, seconds in self.startup_profile.items():
+            lines.append(f"  {phase:<18} {seconds * 1000:9.1f} ms")
+        lines.append(f"  {'total':<18} {sum(self.startup_profile.values()) * 1000:9.1f} ms")
+        return "\n".join(lines)
+
+
+runtime = AgentRuntime()
+
+
+def __getattr__(name):
+    # Keep module-level access (agent.app, agent.vectorstore, ...) working, lazily
+    if name in ("llm", "vectorstore", "hotels", "retriever", "extraction_cache", "fast_path", "app"):
+        return getattr(runtime, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _turn_input(user_input: str, messages: List[HumanMessage | AIMessage] = None) -> AgentState:
+    # With a checkpointer the earlier messages come from the thread, so only the new one is sent
+    return {"messages": (messages or []) + [HumanMessage(content=user_input)]}
+
+
+def _turn_config(thread_id: Optional[str]) -> Optional[dict]:
+    config = None
+    if thread_id is not None:
+        if runtime.checkpointer is None:
+            raise ValueError("thread_id needs a checkpointer (set CHECKPOINTER=delta)")
+        config = {"configurable": {"thread_id": thread_id}}
+    # Adds the metrics/tracing callback when instrumentation is enabled
+    return runtime.instrumentation.config(config)
+
+
+# Function to run the agent; returns the final AgentState (messages, city, cuisine, results)
+def run_hotel_agent(user_input: str, messages: List[HumanMessage | AIMessage] = None,
+                    thread_id: Optional[str] = None) -> AgentState:
+    return runtime.app.invoke(_turn_input(user_input, messages), _turn_config(thread_id))
+
+
+# Async variant for servers: awaits the LLM calls and never blocks the event loop
+async def arun_restaurant_agent(user_input: str, messages: List[HumanMessage | AIMessage] = None,
+                                thread_id: Optional[str] = None) -> AgentState:
+    return await runtime.app.ainvoke(_turn_input(user_input, messages), _turn_config(thread_id))
+
+
+async def stream_restaurant_agent(user_input: str, messages: List[HumanMessage | AIMessage] = None,
+                                  thread_id: Optional[str] = None) -> AsyncIterator[dict]:
+    """Yield the reply as it is produced.
+
+    Events: {"type": "restaurant", "restaurant"} per card as soon as retrieval
+    is done, {"type": "token", "content"} for LLM-rendered reply text,
+    {"type": "message", "content"} for replies produced in one piece, and a
+    final {"type": "done", "state"} with the AgentState arun_restaurant_agent
+    would have returned.
+    """
+    final = None
+    async for mode, chunk in runtime.app.astream(_turn_input(user_input, messages), _turn_config(thread_id),
+                                                 stream_mode=["custom", "messages", "values"]):
+        if mode == "custom":
+            for restaurant in chunk.get("restaurants", []):
+                yield {"type": "restaurant", "restaurant": restaurant}
+        elif mode == "messages":
+            message, _ = chunk
+            if isinstance(message, AIMessageChunk):
+                if message.content:
+                    yield {"type": "token", "content": message.content}
+            elif isinstance(message, AIMessage):
+                yield {"type": "message", "content": message.content}
+        else:
+            final = chunk
+    yield {"type": "done", "state": final}
 
 
 # Interactive session
 def interactive_session():
-    state = None
+    session_id = str(uuid.uuid4())
+    thread_id = session_id if runtime.checkpointer is not None else None
     print("Restaurant recommender AI Agent: Enter your query (e.g., 'Italian restaurant in New york') or 'exit' to quit.")
 
     while True:
@@ -196,12 +684,24 @@ def interactive_session():
             print("Goodbye!")
             break
 
-        state = run_hotel_agent(user_input, state)
-        print(state[-1].content)
+        if thread_id:
+            result = run_hotel_agent(user_input, thread_id=thread_id)
+        else:
+            result = run_hotel_agent(user_input, runtime.sessions.get(session_id))
+            runtime.sessions.put(session_id, result["messages"])
+        print(result["messages"][-1].content)
 
-        if state[-1].content.startswith("No restauranta found") or not state[-1].content.startswith("Please"):
-            state = None
+        reply = result["messages"][-1].content
+        if reply.startswith("No restauranta found") or not reply.startswith("Please"):
+            # Start a new conversation
+            runtime.sessions.delete(session_id)
+            session_id = str(uuid.uuid4())
+            if thread_id:
+                thread_id = session_id
 
 
 if __name__ == "__main__":
+    runtime.warmup()
+    print(runtime.startup_report())
     interactive_session()
+    runtime.save_caches()
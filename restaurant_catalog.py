@@ -0,0 +1,281 @@
+"""Shared in-memory restaurant catalog used by the MCP tools.
+
+The catalog is loaded once at import time and indexed on normalized
+(state, city, cuisine) so that lookups cost O(1) plus the size of the
+result instead of a scan over every restaurant.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Built-in demo data, used when RESTAURANT_CATALOG_FILE is not set
+RESTAURANTS = [
+    {
+        "name": "Pizzeria Bianca",
+        "description": "Neapolitan-style pies from a wood-fired oven.",
+        "cuisine": "Italian",
+        "$$": "$$",
+        "rating": 4.6,
+        "image": "https://images.unsplash.com/photo-1541745537413-b804b0c5fbbf",
+        "city": "Phoenix",
+        "state": "AZ",
+    },
+    {
+        "name": "Desert Ramen Bar",
+        "description": "Slow-simmered broths and hand-pulled noodles.",
+        "cuisine": "Japanese",
+        "$$": "$$",
+        "rating": 4.7,
+        "image": "https://images.unsplash.com/photo-1557872943-16a5ac26437b",
+        "city": "Phoenix",
+        "state": "AZ",
+    },
+    {
+        "name": "Sonoran Grill",
+        "description": "Mesquite-grilled carne asada and street tacos.",
+        "cuisine": "Mexican",
+        "$$": "$$",
+        "rating": 4.5,
+        "image": "https://images.unsplash.com/photo-1552332386-f8dd00dc2f85",
+        "city": "Phoenix",
+        "state": "AZ",
+    },
+    {
+        "name": "Cactus & Curry",
+        "description": "Modern Indian flavors with Southwest touches.",
+        "cuisine": "Indian",
+        "$$": "$$",
+        "rating": 4.4,
+        "image": "https://images.unsplash.com/photo-1604908554007-1d064f7a97a3",
+        "city": "Phoenix",
+        "state": "AZ",
+    },
+    {
+        "name": "Bayview Oyster House",
+        "description": "Raw bar, chowders, and coastal classics.",
+        "cuisine": "Seafood",
+        "$$": "$$$",
+        "rating": 4.6,
+        "image": "https://images.unsplash.com/photo-1553621042-f6e147245754",
+        "city": "San Francisco",
+        "state": "CA",
+    },
+    {
+        "name": "Mission Taquería",
+        "description": "Al pastor cut to order with house-made salsas.",
+        "cuisine": "Mexican",
+        "$$": "$",
+        "rating": 4.7,
+        "image": "https://images.unsplash.com/photo-1541866741-4b1c1f7d2f2a",
+        "city": "San Francisco",
+        "state": "CA",
+    },
+    {
+        "name": "Little Sichuan",
+        "description": "Chongqing spicy noodles and peppercorn specialties.",
+        "cuisine": "Chinese",
+        "$$": "$$",
+        "rating": 4.5,
+        "image": "https://images.unsplash.com/photo-1554995207-c18c203602cb",
+        "city": "San Francisco",
+        "state": "CA",
+    },
+    {
+        "name": "Trattoria del Mare",
+        "description": "Homemade pasta and coastal Italian plates.",
+        "cuisine": "Italian",
+        "$$": "$$$",
+        "rating": 4.6,
+        "image": "https://images.unsplash.com/photo-1521389508051-d7ffb5dc8bbf",
+        "city": "San Francisco",
+        "state": "CA",
+    },
+    {
+        "name": "Brooklyn Slice Co.",
+        "description": "Thin-crust pies with classic NYC toppings.",
+        "cuisine": "Italian",
+        "$$": "$",
+        "rating": 4.3,
+        "image": "https://images.unsplash.com/photo-1548365328-9f547fb0953c",
+        "city": "New York",
+        "state": "NY",
+    },
+    {
+        "name": "Hanami Izakaya",
+        "description": "Yakitori, sashimi, and sake flights.",
+        "cuisine": "Japanese",
+        "$$": "$$$",
+        "rating": 4.8,
+        "image": "https://images.unsplash.com/photo-1553621042-2f9b6f0b7d3a",
+        "city": "New York",
+        "state": "NY",
+    },
+    {
+        "name": "Hanami Izakaya",
+        "description": "Yakitor, sashim",
+        "cuisine": "Japanese",
+        "$$": "$",
+        "rating": 4.1,
+        "image": "https://images.unsplash.com/photo-1553621042-2f9b6f0b7d3a",
+        "city": "New York",
+        "state": "NY",
+    },
+    {
+        "name": "Bombay Junction",
+        "description": "Regional Indian thalis and tandoori specialties.",
+        "cuisine": "Indian",
+        "$$": "$$",
+        "rating": 4.5,
+        "image": "https://images.unsplash.com/photo-1567188040759-fb8a883dc6d0",
+        "city": "New York",
+        "state": "NY",
+    },
+    {
+        "name": "Taco Alley",
+        "description": "Birria tacos and consomé, made daily.",
+        "cuisine": "Mexican",
+        "$$": "$",
+        "rating": 4.4,
+        "image": "https://images.unsplash.com/photo-1551504734-5ee1c4a1479b",
+        "city": "Austin",
+        "state": "TX",
+    },
+    {
+        "name": "Hill Country Smokehouse",
+        "description": "Offset-smoked brisket and ribs by the pound.",
+        "cuisine": "Barbecue",
+        "$$": "$$",
+        "rating": 4.7,
+        "image": "https://images.unsplash.com/photo-1552332386-9c6a7a44d6cf",
+        "city": "Austin",
+        "state": "TX",
+    },
+    {
+        "name": "Uptown Bistro",
+        "description": "Seasonal New American with local produce.",
+        "cuisine": "American",
+        "$$": "$$$",
+        "rating": 4.6,
+        "image": "https://images.unsplash.com/photo-1414235077428-338989a2e8c0",
+        "city": "Chicago",
+        "state": "IL",
+    },
+    {
+        "name": "Kimchi Corner",
+        "description": "Korean BBQ and bubbling stews.",
+        "cuisine": "Korean",
+        "$$": "$$",
+        "rating": 4.5,
+        "image": "https://images.unsplash.com/photo-1544025162-d76694265947",
+        "city": "Chicago",
+        "state": "IL",
+    },
+]
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").split()).casefold()
+
+
+def _structured_row(rest: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a catalog record the way the FirstApp widget consumes it."""
+    return {
+        "name": rest["name"],
+        "description": rest["description"],
+        "cuisine": rest["cuisine"],
+        "price_range": rest["$$"],
+        "rating": rest["rating"],
+        "image": rest["image"],
+    }
+
+
+class RestaurantCatalog:
+    """Read-only restaurant catalog with composite and secondary hash indexes.
+
+    Widget rows are built once per record at load time and shared between
+    lookups, so callers must treat returned rows as immutable.
+    """
+
+    def __init__(self, restaurants: Iterable[Dict[str, Any]]):
+        self._records: List[Dict[str, Any]] = []
+        self._rows: List[Dict[str, Any]] = []
+        self._by_key: Dict[Tuple[str, str, str], List[int]] = {}
+        self._by_city: Dict[Tuple[str, str], List[int]] = {}
+        self._by_cuisine: Dict[str, List[int]] = {}
+
+        for rest in restaurants:
+            idx = len(self._records)
+            self._records.append(rest)
+            self._rows.append(_structured_row(rest))
+
+            state = _normalize(rest["state"])
+            city = _normalize(rest["city"])
+            cuisine = _normalize(rest["cuisine"])
+            self._by_key.setdefault((state, city, cuisine), []).append(idx)
+            self._by_city.setdefault((state, city), []).append(idx)
+            self._by_cuisine.setdefault(cuisine, []).append(idx)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._records)
+
+    def lookup(self, city: str, state: str, cuisine: str) -> List[Dict[str, Any]]:
+        """Return widget rows for an exact (city, state, cuisine) match."""
+        ids = self._by_key.get((_normalize(state), _normalize(city), _normalize(cuisine)), ())
+        return [self._rows[i] for i in ids]
+
+    def by_city(self, city: str, state: str) -> List[Dict[str, Any]]:
+        """Return widget rows for every restaurant in a city."""
+        ids = self._by_city.get((_normalize(state), _normalize(city)), ())
+        return [self._rows[i] for i in ids]
+
+    def by_cuisine(self, cuisine: str) -> List[Dict[str, Any]]:
+        """Return widget rows for every restaurant serving a cuisine."""
+        ids = self._by_cuisine.get(_normalize(cuisine), ())
+        return [self._rows[i] for i in ids]
+
+    def recommendations(self, city: str, state: str, cuisine: str) -> Dict[str, Any]:
+        """Structured content payload for the FirstApp widget."""
+        return {"restaurants": self.lookup(city, state, cuisine)}
+
+    def batch_recommendations(self, queries: Iterable[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """One result per query, in order; repeated (city, state, cuisine) triples are looked up once."""
+        queries = list(queries)
+        keys = [(_normalize(q.get("state")), _normalize(q.get("city")), _normalize(q.get("cuisine")))
+                for q in queries]
+        rows = {key: [self._rows[i] for i in self._by_key.get(key, ())] for key in dict.fromkeys(keys)}
+        return [
+            {"query": {"city": q.get("city"), "state": q.get("state"), "cuisine": q.get("cuisine")},
+             "restaurants": rows[key]}
+            for q, key in zip(queries, keys)
+        ]
+
+
+def _read_catalog_file(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield records from a JSON array or a JSONL file."""
+    with path.open("r", encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def load_catalog(path: Optional[str] = None) -> RestaurantCatalog:
+    """Load the catalog from ``path`` (or RESTAURANT_CATALOG_FILE), else the built-in data."""
+    path = path or os.environ.get("RESTAURANT_CATALOG_FILE")
+    if path:
+        print(f"Loading restaurant catalog from {path}...")
+        return RestaurantCatalog(_read_catalog_file(Path(path)))
+    return RestaurantCatalog(RESTAURANTS)
+
+
+CATALOG = load_catalog()
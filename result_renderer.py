@@ -0,0 +1,60 @@
+"""Deterministic rendering of search results.
+
+search_hotels used to send the filtered metadata through a second LLM call
+only to produce one "<name> in <city>: Cuisine: <cuisine>" line per result.
+The renderers here produce the same text locally, plus the structured
+``restaurants`` list the FirstApp widget consumes.
+"""
+
+from typing import Any, Dict, List
+
+from jinja2 import Environment
+
+NO_RESULTS = "No restaurants found matching your criteria."
+
+RENDER_MODES = ("template", "jinja", "llm")
+
+_JINJA_TEMPLATE = Environment(trim_blocks=True, lstrip_blocks=True).from_string(
+    "{% for r in restaurants %}"
+    "{{ r.name }} in {{ r.city }}: Cuisine: {{ r.cuisine }}\n"
+    "{% endfor %}"
+)
+
+
+def _cuisine_text(meta: Dict[str, Any]) -> str:
+    cuisines = meta.get("cuisines") or meta.get("cuisine") or []
+    return ", ".join(cuisines) if isinstance(cuisines, (list, tuple)) else str(cuisines)
+
+
+def structured_restaurants(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Map result metadata to the widget's restaurant rows."""
+    return [
+        {
+            "name": meta.get("name", ""),
+            "description": meta.get("description", ""),
+            "cuisine": _cuisine_text(meta),
+            "price_range": meta.get("price_range", meta.get("$$", "")),
+            "rating": meta.get("rating"),
+            "image": meta.get("image", ""),
+            "city": meta.get("city", ""),
+        }
+        for meta in results
+    ]
+
+
+def render_template(restaurants: List[Dict[str, Any]]) -> str:
+    if not restaurants:
+        return NO_RESULTS
+    return "\n".join(f"{r['name']} in {r['city']}: Cuisine: {r['cuisine']}" for r in restaurants)
+
+
+def render_jinja(restaurants: List[Dict[str, Any]]) -> str:
+    if not restaurants:
+        return NO_RESULTS
+    return _JINJA_TEMPLATE.render(restaurants=restaurants).rstrip("\n")
+
+
+RENDERERS = {
+    "template": render_template,
+    "jinja": render_jinja,
+}
@@ -0,0 +1,162 @@
+"""City-partitioned, cuisine-prefiltered vector retrieval.
+
+Searching the whole index for the top 5 and then dropping rows with the wrong
+city or cuisines returns nothing as soon as the catalog is large. Instead the
+FAISS vectors are split into one sub-index per city and the candidate IDs for
+the requested cuisines are computed from posting lists before any vector is
+scored, so only matching rows ever reach the ANN search.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import faiss
+import numpy as np
+
+# Up to this many candidates are scored exactly instead of through the (approximate) index
+EXACT_SCORING_MAX = 4096
+# Approximate searches are widened until they are expected to reach this many candidates per result
+CANDIDATE_MARGIN = 4
+
+
+class RetrievalResult(NamedTuple):
+    rows: List[dict]
+    scores: List[float]
+    candidates_scored: int
+
+
+def _key(value: str) -> str:
+    return " ".join((value or "").split()).casefold()
+
+
+def _selector_params(index: faiss.Index, ids: np.ndarray, k: int) -> faiss.SearchParameters:
+    """Search parameters restricted to ``ids``.
+
+    nprobe/efSearch are tuned for unfiltered queries. With a filter only
+    ``len(ids) / ntotal`` of the visited vectors qualify, so they are raised
+    until about CANDIDATE_MARGIN * k candidates are expected to be visited.
+    """
+    sel = faiss.IDSelectorBatch(ids)
+    wanted = CANDIDATE_MARGIN * k
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        nprobe = int(np.ceil(ivf.nlist * wanted / len(ids)))
+        return faiss.SearchParametersIVF(sel=sel, nprobe=min(ivf.nlist, max(ivf.nprobe, nprobe)))
+    if isinstance(index, faiss.IndexHNSW):
+        ef_search = int(np.ceil(index.ntotal * wanted / len(ids)))
+        return faiss.SearchParametersHNSW(sel=sel, efSearch=min(index.ntotal, max(index.hnsw.efSearch, ef_search)))
+    return faiss.SearchParameters(sel=sel)
+
+
+class PartitionedRetriever:
+    """Filtered top-k search over a FAISS index and its per-vector metadata.
+
+    ``metadatas[i]`` is the metadata of vector ``i`` in ``index``. For flat
+    indexes a flat sub-index is built per city. Compressed or approximate
+    indexes (IVF, PQ, HNSW, SQ) are searched globally with an ID selector
+    restricted to the candidates, since per-city float copies would undo the
+    compression.
+    """
+
+    def __init__(self, index: faiss.Index, metadatas: Sequence[dict], partition_by_city: Optional[bool] = None):
+        self.index = index
+        self.metadatas = metadatas
+
+        if hasattr(metadatas, "postings"):
+            # Columnar metadata computes the posting lists without decoding rows
+            self._city_ids, self._cuisine_ids = metadatas.postings()
+        else:
+            city_ids: Dict[str, List[int]] = {}
+            cuisine_ids: Dict[str, List[int]] = {}
+            for i, meta in enumerate(metadatas):
+                city_ids.setdefault(_key(meta.get("city")), []).append(i)
+                for cuisine in meta.get("cuisines") or []:
+                    cuisine_ids.setdefault(_key(cuisine), []).append(i)
+            self._city_ids = {k: np.asarray(v, dtype=np.int64) for k, v in city_ids.items()}
+            self._cuisine_ids = {k: np.asarray(v, dtype=np.int64) for k, v in cuisine_ids.items()}
+
+        self._city_index: Dict[str, faiss.Index] = {}
+        if partition_by_city is None:
+            partition_by_city = isinstance(index, faiss.IndexFlat)
+        if partition_by_city:
+            try:
+                self._build_partitions()
+            except RuntimeError:
+                print("Index cannot reconstruct vectors, using ID-selector filtering")
+                self._city_index = {}
+
+        # Reconstructing IVF vectors by ID (exact scoring of small candidate sets) needs the direct map
+        ivf = faiss.try_extract_index_ivf(index)
+        self._can_reconstruct = True
+        if ivf is not None:
+            try:
+                ivf.make_direct_map()
+            except RuntimeError:
+                self._can_reconstruct = False
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs) -> "PartitionedRetriever":
+        """Build from a LangChain FAISS store, reading metadata in vector-ID order."""
+        metadatas = [
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).metadata
+            for i in range(vectorstore.index.ntotal)
+        ]
+        return cls(vectorstore.index, metadatas, **kwargs)
+
+    def _build_partitions(self):
+        for city, ids in self._city_ids.items():
+            vectors = np.asarray(self.index.reconstruct_batch(ids), dtype=np.float32)
+            sub_index = faiss.IndexIDMap2(faiss.IndexFlat(self.index.d, self.index.metric_type))
+            sub_index.add_with_ids(vectors, ids)
+            self._city_index[city] = sub_index
+
+    def _score_exact(self, query: np.ndarray, ids: np.ndarray, k: int):
+        """(distances, labels) of the ``k`` best ``ids``, shaped like Index.search output.
+
+        Compressed indexes (PQ, SQ8) reconstruct their decoded vectors, which
+        is what their own search scores as well.
+        """
+        vectors = np.asarray(self.index.reconstruct_batch(ids), dtype=np.float32)
+        if self.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            distances = vectors @ query
+            order = np.argsort(-distances, kind="stable")[:k]
+        else:
+            distances = ((vectors - query) ** 2).sum(axis=1)
+            order = np.argsort(distances, kind="stable")[:k]
+        return distances[order][None, :], ids[order][None, :]
+
+    def candidates(self, city: str, cuisines: Optional[Sequence[str]]) -> np.ndarray:
+        """Vector IDs in ``city`` serving every cuisine in ``cuisines``."""
+        ids = self._city_ids.get(_key(city))
+        if ids is None:
+            return np.empty(0, dtype=np.int64)
+        for cuisine in cuisines or []:
+            ids = np.intersect1d(ids, self._cuisine_ids.get(_key(cuisine), ()), assume_unique=True)
+            if not len(ids):
+                break
+        return ids
+
+    def search(self, vector, city: str, cuisines: Optional[Sequence[str]], k: int = 5) -> RetrievalResult:
+        candidates = self.candidates(city, cuisines)
+        if not len(candidates):
+            return RetrievalResult([], [], 0)
+
+        query = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        k = min(k, len(candidates))
+        city_index = self._city_index.get(_key(city))
+        if city_index is not None and len(candidates) == city_index.ntotal:
+            # Every row in the partition qualifies, no selector needed
+            distances, labels = city_index.search(query, k)
+        elif city_index is None and len(candidates) <= EXACT_SCORING_MAX and self._can_reconstruct:
+            # An approximate index may never visit a small filtered set, so score it directly
+            distances, labels = self._score_exact(query[0], candidates, k)
+        else:
+            target = city_index if city_index is not None else self.index
+            distances, labels = target.search(query, k, params=_selector_params(target, candidates, k))
+
+        rows, scores = [], []
+        for distance, label in zip(distances[0], labels[0]):
+            if label < 0:
+                continue
+            rows.append(self.metadatas[int(label)])
+            scores.append(float(distance))
+        return RetrievalResult(rows, scores, int(len(candidates)))
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
 import secrets
+import threading
+import time
 import urllib.parse
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
 
 import mcp.types as types
 from fastapi import FastAPI, Form, HTTPException, Request
 from fastmcp import FastMCP
+from pydantic import BaseModel, Field
 from starlette.responses import RedirectResponse, HTMLResponse
 from starlette.templating import Jinja2Templates
 
+from restaurant_catalog import CATALOG
+from single_flight import SingleFlight, normalize_key
+
 #from oidc_auth_server import auth_codes
 
 # Initialize FastMCP with HTTP streaming
@@ -21,21 +29,132 @@ mcp = FastMCP(
 )
 
 
-
 STATIC_DIR = Path(__file__).parent / "static"
-FIRST_CSS = (STATIC_DIR / "first-app.css").read_text()
-FIRST_JS = (STATIC_DIR / "first-app.js").read_text()
+FIRST_CSS_PATH = STATIC_DIR / "first-app.css"
+FIRST_JS_PATH = STATIC_DIR / "first-app.js"
 templates = Jinja2Templates(directory="templates")
 
+MIME_TYPE = "text/html+skybridge"
+TEMPLATE_URI = "ui://widget/firstapp.html"
+
+# Security-scheme and metadata blocks are shared by every handler; they are
+# built once here and must not be mutated.
+OAUTH2_SECURITY_SCHEME = {
+    "type": "oauth2",
+    "flows": {
+        "authorizationCode": {
+            "authorization_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/authorize",
+            "token_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/token",
+            "registration_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/register",
+            "authorizationUrl": "https://0c819c023f82.ngrok-free.app/oauth2/authorize",
+            "tokenUrl": "https://0c819c023f82.ngrok-free.app/oauth2/token",
+            "scopes": {
+                "token": "token"
+            }
+        }
+    }
+}
+TOOL_SECURITY_SCHEMES = [OAUTH2_SECURITY_SCHEME]
+RESOURCE_SECURITY_SCHEMES = [{"type": "noauth"}, OAUTH2_SECURITY_SCHEME]
+
+WIDGET_META = {
+    "openai/outputTemplate": TEMPLATE_URI,
+    "openai/toolInvocation/invoking": "Running FirstApp",
+    "openai/toolInvocation/invoked": "Completed FirstApp",
+    "openai/widgetAccessible": True,
+    "openai/resultCanProduceWidget": True,
+}
+WIDGET_ANNOTATIONS = {
+    "destructiveHint": False,
+    "openWorldHint": False,
+    "readOnlyHint": True,
+}
+
+
 # === UI HTML that ChatGPT renders as a component ===
-def get_first_app_html():
+def _render_first_app_html(css: str, js: str) -> str:
     return f"""<div id="first-app-root"></div>
-    <style>{FIRST_CSS}</style>
-    <script type="module">{FIRST_JS}</script>"""
+    <style>{css}</style>
+    <script type="module">{js}</script>"""
+
+
+class _WidgetBundle:
+    """Everything derived from the widget assets, serialized once."""
+
+    def __init__(self, css: str, js: str):
+        self.html = _render_first_app_html(css, js)
+        self.etag = hashlib.sha256(self.html.encode("utf-8")).hexdigest()[:32]
+        widget_resource = types.EmbeddedResource(
+            type="resource",
+            resource=types.TextResourceContents(
+                uri=TEMPLATE_URI,
+                mimeType=MIME_TYPE,
+                text=self.html,
+                title="First App",
+            ),
+        )
+        self.tool_result_meta = {
+            "openai.com/widget": widget_resource.model_dump(mode="json"),
+            **WIDGET_META,
+        }
+        self.resource_contents = [
+            types.TextResourceContents(
+                uri=TEMPLATE_URI,
+                mimeType=MIME_TYPE,
+                text=self.html,
+                _meta={**WIDGET_META, "etag": self.etag},
+                securitySchemes=RESOURCE_SECURITY_SCHEMES,
+            )
+        ]
 
 
-MIME_TYPE = "text/html+skybridge"
-TEMPLATE_URI = "ui://widget/firstapp.html"
+class _WidgetCache:
+    """Holds the current _WidgetBundle and rebuilds it when the static files change.
+
+    The mtimes are checked at most once per ``check_interval`` seconds, so the
+    hot path is a monotonic clock read and an attribute lookup.
+    """
+
+    def __init__(self, css_path: Path, js_path: Path, check_interval: float = 1.0):
+        self.css_path = css_path
+        self.js_path = js_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtimes = None
+        self._next_check = 0.0
+        self._bundle = None
+        self._refresh()
+
+    def _current_mtimes(self):
+        return self.css_path.stat().st_mtime_ns, self.js_path.stat().st_mtime_ns
+
+    def _refresh(self):
+        mtimes = self._current_mtimes()
+        if mtimes != self._mtimes:
+            bundle = _WidgetBundle(self.css_path.read_text(), self.js_path.read_text())
+            if self._bundle is not None:
+                print(f"Widget assets changed, new etag {bundle.etag}")
+            self._bundle, self._mtimes = bundle, mtimes
+        self._next_check = time.monotonic() + self.check_interval
+
+    def get(self) -> _WidgetBundle:
+        if time.monotonic() >= self._next_check:
+            with self._lock:
+                if time.monotonic() >= self._next_check:
+                    try:
+                        self._refresh()
+                    except OSError as e:
+                        # Keep serving the last good bundle while files are being replaced
+                        print(f"Could not reload widget assets: {e}")
+                        self._next_check = time.monotonic() + self.check_interval
+        return self._bundle
+
+
+WIDGET_CACHE = _WidgetCache(FIRST_CSS_PATH, FIRST_JS_PATH)
+
+
+def get_first_app_html():
+    return WIDGET_CACHE.get().html
 
 
 
@@ -59,17 +178,6 @@ def _make_unauthorized_result() -> types.ServerResult:
             message="unauthorized"  # short keyword recognized by ChatGPT
         )
     )
-def _embedded_widget_resource():
-    """Create embedded widget resource for ChatGPT UI rendering."""
-    return types.EmbeddedResource(
-        type="resource",
-        resource=types.TextResourceContents(
-            uri=TEMPLATE_URI,
-            mimeType=MIME_TYPE,
-            text=get_first_app_html(),
-            title="First App",
-        ),
-    )
 
 @mcp.tool()
 def get_recommendations(city: str,state: str, cuisine: str) -> Dict[str, Any]:
@@ -84,195 +192,81 @@ def get_recommendations(city: str,state: str, cuisine: str) -> Dict[str, Any]:
     Returns:
         A dictionary containing the restaurant name, description, cuisine, $$, rating, image, city and state.
     """
-    # Simulate fetching data
-    RESTAURANTS = [
-        {
-            "name": "Pizzeria Bianca",
-            "description": "Neapolitan-style pies from a wood-fired oven.",
-            "cuisine": "Italian",
-            "$$": "$$",
-            "rating": 4.6,
-            "image": "https://images.unsplash.com/photo-1541745537413-b804b0c5fbbf",
-            "city": "Phoenix",
-            "state": "AZ",
-        },
-        {
-            "name": "Desert Ramen Bar",
-            "description": "Slow-simmered broths and hand-pulled noodles.",
-            "cuisine": "Japanese",
-            "$$": "$$",
-            "rating": 4.7,
-            "image": "https://images.unsplash.com/photo-1557872943-16a5ac26437b",
-            "city": "Phoenix",
-            "state": "AZ",
-        },
-        {
-            "name": "Sonoran Grill",
-            "description": "Mesquite-grilled carne asada and street tacos.",
-            "cuisine": "Mexican",
-            "$$": "$$",
-            "rating": 4.5,
-            "image": "https://images.unsplash.com/photo-1552332386-f8dd00dc2f85",
-            "city": "Phoenix",
-            "state": "AZ",
-        },
-        {
-            "name": "Cactus & Curry",
-            "description": "Modern Indian flavors with Southwest touches.",
-            "cuisine": "Indian",
-            "$$": "$$",
-            "rating": 4.4,
-            "image": "https://images.unsplash.com/photo-1604908554007-1d064f7a97a3",
-            "city": "Phoenix",
-            "state": "AZ",
-        },
-        {
-            "name": "Bayview Oyster House",
-            "description": "Raw bar, chowders, and coastal classics.",
-            "cuisine": "Seafood",
-            "$$": "$$$",
-            "rating": 4.6,
-            "image": "https://images.unsplash.com/photo-1553621042-f6e147245754",
-            "city": "San Francisco",
-            "state": "CA",
-        },
-        {
-            "name": "Mission Taquería",
-            "description": "Al pastor cut to order with house-made salsas.",
-            "cuisine": "Mexican",
-            "$$": "$",
-            "rating": 4.7,
-            "image": "https://images.unsplash.com/photo-1541866741-4b1c1f7d2f2a",
-            "city": "San Francisco",
-            "state": "CA",
-        },
-        {
-            "name": "Little Sichuan",
-            "description": "Chongqing spicy noodles and peppercorn specialties.",
-            "cuisine": "Chinese",
-            "$$": "$$",
-            "rating": 4.5,
-            "image": "https://images.unsplash.com/photo-1554995207-c18c203602cb",
-            "city": "San Francisco",
-            "state": "CA",
-        },
-        {
-            "name": "Trattoria del Mare",
-            "description": "Homemade pasta and coastal Italian plates.",
-            "cuisine": "Italian",
-            "$$": "$$$",
-            "rating": 4.6,
-            "image": "https://images.unsplash.com/photo-1521389508051-d7ffb5dc8bbf",
-            "city": "San Francisco",
-            "state": "CA",
-        },
-        {
-            "name": "Brooklyn Slice Co.",
-            "description": "Thin-crust pies with classic NYC toppings.",
-            "cuisine": "Italian",
-            "$$": "$",
-            "rating": 4.3,
-            "image": "https://images.unsplash.com/photo-1548365328-9f547fb0953c",
-            "city": "New York",
-            "state": "NY",
-        },
-        {
-            "name": "Hanami Izakaya",
-            "description": "Yakitori, sashimi, and sake flights.",
-            "cuisine": "Japanese",
-            "$$": "$$$",
-            "rating": 4.8,
-            "image": "https://images.unsplash.com/photo-1553621042-2f9b6f0b7d3a",
-            "city": "New York",
-            "state": "NY",
-        },
-        {
-            "name": "Hanami Izakaya",
-            "description": "Yakitor, sashim",
-            "cuisine": "Japanese",
-            "$$": "$",
-            "rating": 4.1,
-            "image": "https://images.unsplash.com/photo-1553621042-2f9b6f0b7d3a",
-            "city": "New York",
-            "state": "NY",
-        },
-        {
-            "name": "Bombay Junction",
-            "description": "Regional Indian thalis and tandoori specialties.",
-            "cuisine": "Indian",
-            "$$": "$$",
-            "rating": 4.5,
-            "image": "https://images.unsplash.com/photo-1567188040759-fb8a883dc6d0",
-            "city": "New York",
-            "state": "NY",
-        },
-        {
-            "name": "Taco Alley",
-            "description": "Birria tacos and consomé, made daily.",
-            "cuisine": "Mexican",
-            "$$": "$",
-            "rating": 4.4,
-            "image": "https://images.unsplash.com/photo-1551504734-5ee1c4a1479b",
-            "city": "Austin",
-            "state": "TX",
-        },
-        {
-            "name": "Hill Country Smokehouse",
-            "description": "Offset-smoked brisket and ribs by the pound.",
-            "cuisine": "Barbecue",
-            "$$": "$$",
-            "rating": 4.7,
-            "image": "https://images.unsplash.com/photo-1552332386-9c6a7a44d6cf",
-            "city": "Austin",
-            "state": "TX",
-        },
-        {
-            "name": "Uptown Bistro",
-            "description": "Seasonal New American with local produce.",
-            "cuisine": "American",
-            "$$": "$$$",
-            "rating": 4.6,
-            "image": "https://images.unsplash.com/photo-1414235077428-338989a2e8c0",
-            "city": "Chicago",
-            "state": "IL",
-        },
-        {
-            "name": "Kimchi Corner",
-            "description": "Korean BBQ and bubbling stews.",
-            "cuisine": "Korean",
-            "$$": "$$",
-            "rating": 4.5,
-            "image": "https://images.unsplash.com/photo-1544025162-d76694265947",
-            "city": "Chicago",
-            "state": "IL",
-        },
-    ]
+    return CATALOG.recommendations(city, state, cuisine)
 
-    results = []
-    for rest in RESTAURANTS:
-        if rest["city"] == city and rest["state"] == state and rest["cuisine"] == cuisine:
-            results.append(rest)
 
-    structured_content = {
-        "restaurants": []
-    }
+# Identical concurrent first_app_tool calls share one lookup, results kept briefly
+RECOMMENDATION_FLIGHT = SingleFlight(ttl=float(os.environ.get("RECOMMENDATION_CACHE_TTL", 30)))
+
+
+async def _recommendations(city: str, state: str, cuisine: str) -> Dict[str, Any]:
+    async def lookup():
+        return CATALOG.recommendations(city, state, cuisine)
+    return await RECOMMENDATION_FLIGHT.ado(normalize_key(city, state, cuisine), lookup)
+
+
+BATCH_TOOL_NAME = "first_app_batch_tool"
+MAX_BATCH_QUERIES = int(os.environ.get("RECOMMENDATION_BATCH_MAX", 100))
 
-    for r in results:
-        structured_content["restaurants"].append({
-            "name": r["name"],
-            "description": r["description"],
-            "cuisine": r["cuisine"],
-            "price_range": r["$$"],
-            "rating": r["rating"],
-            "image": r["image"]
-        })
 
-    return structured_content
+BATCH_QUERY_FIELDS = ("city", "state", "cuisine")
+
+
+def _batch_query_error(query: Any) -> Optional[str]:
+    """Why ``query`` is not a valid {city, state, cuisine} object, or None."""
+    if not isinstance(query, dict):
+        return "query must be a {city, state, cuisine} object"
+    invalid = [field for field in BATCH_QUERY_FIELDS if not isinstance(query.get(field), str)]
+    return f"{', '.join(invalid)} must be a string" if invalid else None
+
+
+def _batch_recommendations(queries: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Results grouped per query; repeated triples are looked up once.
+
+    Malformed queries get an ``error`` entry in their slot instead of failing the whole batch.
+    """
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise ValueError(f"At most {MAX_BATCH_QUERIES} queries per batch, got {len(queries)}")
+    errors = [_batch_query_error(q) for q in queries]
+    valid = [q for q, error in zip(queries, errors) if error is None]
+    found = iter(CATALOG.batch_recommendations(valid))
+    results = [next(found) if error is None else {"query": q, "restaurants": [], "error": error}
+               for q, error in zip(queries, errors)]
+    unique = len({normalize_key(q["city"], q["state"], q["cuisine"]) for q in valid})
+    return {"results": results, "unique_queries": unique}
+
+
+def _call_batch_tool(arguments: Dict[str, Any]) -> types.ServerResult:
+    queries = arguments.get("queries")
+    try:
+        if not isinstance(queries, list):
+            raise ValueError("queries must be a list of {city, state, cuisine} objects")
+        structured_content = _batch_recommendations(queries)
+    except ValueError as e:
+        return types.ServerResult(
+            types.CallToolResult(content=[types.TextContent(type="text", text=str(e))], isError=True)
+        )
+
+    print(f"Batch of {len(queries)} queries, {structured_content['unique_queries']} unique")
+    return types.ServerResult(
+        types.CallToolResult(
+            content=[
+                types.TextContent(
+                    type="text",
+                    text=f"FirstApp batch completed for {len(queries)} queries",
+                )
+            ],
+            structuredContent=structured_content,
+        )
+    )
 
 
 # Override call_tool handler to use the working pattern
 async def _call_tool_request(req: types.CallToolRequest) -> types.ServerResult:
 
+    if req.params.name == BATCH_TOOL_NAME:
+        return _call_batch_tool(req.params.arguments or {})
+
     if req.params.name != "first_app_tool":
         return types.ServerResult(
             types.CallToolResult(
@@ -296,202 +290,12 @@ async def _call_tool_request(req: types.CallToolRequest) -> types.ServerResult:
     print(f"City is {city}")
     print(f"State is {state}")
 
-    RESTAURANTS = [
-        {
-            "name": "Pizzeria Bianca",
-            "description": "Neapolitan-style pies from a wood-fired oven.",
-            "cuisine": "Italian",
-            "$$": "$$",
-            "rating": 4.6,
-            "image": "https://images.unsplash.com/photo-1541745537413-b804b0c5fbbf",
-            "city": "Phoenix",
-            "state": "AZ",
-        },
-        {
-            "name": "Desert Ramen Bar",
-            "description": "Slow-simmered broths and hand-pulled noodles.",
-            "cuisine": "Japanese",
-            "$$": "$$",
-            "rating": 4.7,
-            "image": "https://images.unsplash.com/photo-1557872943-16a5ac26437b",
-            "city": "Phoenix",
-            "state": "AZ",
-        },
-        {
-            "name": "Sonoran Grill",
-            "description": "Mesquite-grilled carne asada and street tacos.",
-            "cuisine": "Mexican",
-            "$$": "$$",
-            "rating": 4.5,
-            "image": "https://images.unsplash.com/photo-1552332386-f8dd00dc2f85",
-            "city": "Phoenix",
-            "state": "AZ",
-        },
-        {
-            "name": "Cactus & Curry",
-            "description": "Modern Indian flavors with Southwest touches.",
-            "cuisine": "Indian",
-            "$$": "$$",
-            "rating": 4.4,
-            "image": "https://images.unsplash.com/photo-1604908554007-1d064f7a97a3",
-            "city": "Phoenix",
-            "state": "AZ",
-        },
-        {
-            "name": "Bayview Oyster House",
-            "description": "Raw bar, chowders, and coastal classics.",
-            "cuisine": "Seafood",
-            "$$": "$$$",
-            "rating": 4.6,
-            "image": "https://images.unsplash.com/photo-1553621042-f6e147245754",
-            "city": "San Francisco",
-            "state": "CA",
-        },
-        {
-            "name": "Mission Taquería",
-            "description": "Al pastor cut to order with house-made salsas.",
-            "cuisine": "Mexican",
-            "$$": "$",
-            "rating": 4.7,
-            "image": "https://images.unsplash.com/photo-1541866741-4b1c1f7d2f2a",
-            "city": "San Francisco",
-            "state": "CA",
-        },
-        {
-            "name": "Little Sichuan",
-            "description": "Chongqing spicy noodles and peppercorn specialties.",
-            "cuisine": "Chinese",
-            "$$": "$$",
-            "rating": 4.5,
-            "image": "https://images.unsplash.com/photo-1554995207-c18c203602cb",
-            "city": "San Francisco",
-            "state": "CA",
-        },
-        {
-            "name": "Trattoria del Mare",
-            "description": "Homemade pasta and coastal Italian plates.",
-            "cuisine": "Italian",
-            "$$": "$$$",
-            "rating": 4.6,
-            "image": "https://images.unsplash.com/photo-1521389508051-d7ffb5dc8bbf",
-            "city": "San Francisco",
-            "state": "CA",
-        },
-        {
-            "name": "Brooklyn Slice Co.",
-            "description": "Thin-crust pies with classic NYC toppings.",
-            "cuisine": "Italian",
-            "$$": "$",
-            "rating": 4.3,
-            "image": "https://images.unsplash.com/photo-1548365328-9f547fb0953c",
-            "city": "New York",
-            "state": "NY",
-        },
-        {
-            "name": "Hanami Izakaya",
-            "description": "Yakitori, sashimi, and sake flights.",
-            "cuisine": "Japanese",
-            "$$": "$$$",
-            "rating": 4.8,
-            "image": "https://images.unsplash.com/photo-1553621042-2f9b6f0b7d3a",
-            "city": "New York",
-            "state": "NY",
-        },
-        {
-            "name": "Hanami Izakaya",
-            "description": "Yakitor, sashim",
-            "cuisine": "Japanese",
-            "$$": "$",
-            "rating": 4.1,
-            "image": "https://images.unsplash.com/photo-1553621042-2f9b6f0b7d3a",
-            "city": "New York",
-            "state": "NY",
-        },
-        {
-            "name": "Bombay Junction",
-            "description": "Regional Indian thalis and tandoori specialties.",
-            "cuisine": "Indian",
-            "$$": "$$",
-            "rating": 4.5,
-            "image": "https://images.unsplash.com/photo-1567188040759-fb8a883dc6d0",
-            "city": "New York",
-            "state": "NY",
-        },
-        {
-            "name": "Taco Alley",
-            "description": "Birria tacos and consomé, made daily.",
-            "cuisine": "Mexican",
-            "$$": "$",
-            "rating": 4.4,
-            "image": "https://images.unsplash.com/photo-1551504734-5ee1c4a1479b",
-            "city": "Austin",
-            "state": "TX",
-        },
-        {
-            "name": "Hill Country Smokehouse",
-            "description": "Offset-smoked brisket and ribs by the pound.",
-            "cuisine": "Barbecue",
-            "$$": "$$",
-            "rating": 4.7,
-            "image": "https://images.unsplash.com/photo-1552332386-9c6a7a44d6cf",
-            "city": "Austin",
-            "state": "TX",
-        },
-        {
-            "name": "Uptown Bistro",
-            "description": "Seasonal New American with local produce.",
-            "cuisine": "American",
-            "$$": "$$$",
-            "rating": 4.6,
-            "image": "https://images.unsplash.com/photo-1414235077428-338989a2e8c0",
-            "city": "Chicago",
-            "state": "IL",
-        },
-        {
-            "name": "Kimchi Corner",
-            "description": "Korean BBQ and bubbling stews.",
-            "cuisine": "Korean",
-            "$$": "$$",
-            "rating": 4.5,
-            "image": "https://images.unsplash.com/photo-1544025162-d76694265947",
-            "city": "Chicago",
-            "state": "IL",
-        },
-    ]
-
-    results = []
-    for rest in RESTAURANTS:
-        if rest["city"] == city and rest["state"] == state and rest["cuisine"] == cuisine:
-            results.append(rest)
-
-    structured_content = {
-        "restaurants": []
-    }
-
-    for r in results:
-        structured_content["restaurants"].append({
-            "name": r["name"],
-            "description": r["description"],
-            "cuisine": r["cuisine"],
-            "price_range": r["$$"],
-            "rating": r["rating"],
-            "image": r["image"]
-        })
+    structured_content = await _recommendations(city, state, cuisine)
 
     print(json.dumps(structured_content, indent=2))
 
-    # Create embedded widget resource for ChatGPT integration
-    widget_resource = _embedded_widget_resource()
-
-    # Build metadata with embedded widget for UI rendering
-    meta = {
-        "openai.com/widget": widget_resource.model_dump(mode="json"),
-        "openai/outputTemplate": TEMPLATE_URI,
-        "openai/toolInvocation/invoking": "Running FirstApp",
-        "openai/toolInvocation/invoked": "Completed FirstApp",
-        "openai/widgetAccessible": True,
-        "openai/resultCanProduceWidget": True,
-    }
+    # Metadata with the embedded widget is serialized once per asset version
+    meta = WIDGET_CACHE.get().tool_result_meta
 
     # Return result with structured content (following working example pattern)
     return types.ServerResult(
@@ -537,120 +341,81 @@ async def list_tools(context):
     return types.ListToolsResult(tools=tools)
 
 
-
-# Register the tool following the working pattern
-@mcp._mcp_server.list_tools()
-async def _list_tools(req: types.ListToolsRequest) -> list[types.Tool]:
-    return [
-        types.Tool(
-            name="first_app_tool",
-            title="FirstApp Tool",
-            description="FirstApp",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "city": {"type": "string", "description": "City"},
-                    "state": {"type": "string", "description": "State"},
-                    "cuisine": {"type": "string", "description": "Preferred cuisine"}
-                },
-                "required": ["city", "state", "cuisine"],
+TOOLS = [
+    types.Tool(
+        name="first_app_tool",
+        title="FirstApp Tool",
+        description="FirstApp",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "city": {"type": "string", "description": "City"},
+                "state": {"type": "string", "description": "State"},
+                "cuisine": {"type": "string", "description": "Preferred cuisine"}
             },
-            _meta={
-                "openai/outputTemplate": TEMPLATE_URI,
-                "openai/toolInvocation/invoking": "Running FirstApp",
-                "openai/toolInvocation/invoked": "Completed FirstApp",
-                "openai/widgetAccessible": True,
-                "openai/resultCanProduceWidget": True,
-                "annotations": {
-                    "destructiveHint": False,
-                    "openWorldHint": False,
-                    "readOnlyHint": True,
-                }
+            "required": ["city", "state", "cuisine"],
+        },
+        _meta={**WIDGET_META, "annotations": WIDGET_ANNOTATIONS},
+        securitySchemes=TOOL_SECURITY_SCHEMES,
+    ),
+    types.Tool(
+        name=BATCH_TOOL_NAME,
+        title="FirstApp Batch Tool",
+        description="Recommendations for many (city, state, cuisine) queries in one call",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "queries": {
+                    "type": "array",
+                    "maxItems": MAX_BATCH_QUERIES,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "city": {"type": "string", "description": "City"},
+                            "state": {"type": "string", "description": "State"},
+                            "cuisine": {"type": "string", "description": "Preferred cuisine"}
+                        },
+                        "required": ["city", "state", "cuisine"],
+                    },
+                },
             },
-            securitySchemes=[
-                    {
-                        "type": "oauth2",
-                        "flows": {
-                            "authorizationCode": {
-                                "authorization_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/authorize",
-                                "token_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/token",
-                                "registration_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/register",
-                                "authorizationUrl": "https://0c819c023f82.ngrok-free.app/oauth2/authorize",
-                                "tokenUrl": "https://0c819c023f82.ngrok-free.app/oauth2/token",
-                                "scopes": {
-                                    "token": "token"
-                                }
-                            }
-                        }
-                    }]
-        )
-    ]
-
+            "required": ["queries"],
+        },
+        _meta={"annotations": WIDGET_ANNOTATIONS},
+        securitySchemes=TOOL_SECURITY_SCHEMES,
+    ),
+]
 
 
+# Register the tool following the working pattern
+@mcp._mcp_server.list_tools()
+async def _list_tools(req: types.ListToolsRequest) -> list[types.Tool]:
+    return TOOLS
+
+
+RESOURCES = [
+    types.Resource(
+        name="FirstApp",
+        title="FirstApp",
+        uri=TEMPLATE_URI,
+        description="FirstApp widget markup",
+        mimeType=MIME_TYPE,
+        _meta={**WIDGET_META, "annotations": WIDGET_ANNOTATIONS},
+        securitySchemes=RESOURCE_SECURITY_SCHEMES,
+    ),
+    types.Resource(
+        uri="resource://mcp/tools/call",
+        name="Tool Invocation",
+        mimeType=MIME_TYPE,
+        securitySchemes=RESOURCE_SECURITY_SCHEMES,
+    )
+]
 
 
 # Override list_resources to register UI components like working example
 @mcp._mcp_server.list_resources()
 async def _list_resources() -> list[types.Resource]:
-    return [
-        types.Resource(
-            name="FirstApp",
-            title="FirstApp",
-            uri=TEMPLATE_URI,
-            description="FirstApp widget markup",
-            mimeType=MIME_TYPE,
-            _meta={
-                "openai/outputTemplate": TEMPLATE_URI,
-                "openai/toolInvocation/invoking": "Running FirstApp",
-                "openai/toolInvocation/invoked": "Completed FirstApp",
-                "openai/widgetAccessible": True,
-                "openai/resultCanProduceWidget": True,
-                "annotations": {
-                    "destructiveHint": False,
-                    "openWorldHint": False,
-                    "readOnlyHint": True,
-                }
-            },
-            securitySchemes=[{"type": "noauth"},
-                             {
-                                 "type": "oauth2",
-                                 "flows": {
-                                     "authorizationCode": {
-                                         "authorization_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/authorize",
-                                         "token_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/token",
-                                         "registration_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/register",
-                                         "authorizationUrl": "https://0c819c023f82.ngrok-free.app/oauth2/authorize",
-                                         "tokenUrl": "https://0c819c023f82.ngrok-free.app/oauth2/token",
-                                         "scopes": {
-                                             "token": "token"
-                                         }
-                                     }
-                                 }
-                             }]
-        ),
-        types.Resource(
-            uri="resource://mcp/tools/call",
-            name="Tool Invocation",
-            mimeType=MIME_TYPE,
-            securitySchemes=[{"type": "noauth"},
-                             {
-                                 "type": "oauth2",
-                                 "flows": {
-                                     "authorizationCode": {
-                                         "authorization_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/authorize",
-                                         "token_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/token",
-                                         "registration_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/register",
-                                         "authorizationUrl": "https://0c819c023f82.ngrok-free.app/oauth2/authorize",
-                                         "tokenUrl": "https://0c819c023f82.ngrok-free.app/oauth2/token",
-                                         "scopes": {
-                                             "token": "token"
-                                         }
-                                     }
-                                 }
-                             }]
-        )
-    ]
+    return RESOURCES
 
 
 # Override read_resource handler to serve UI components like working example
@@ -663,38 +428,7 @@ async def _handle_read_resource(req: types.ReadResourceRequest) -> types.ServerR
             )
         )
 
-    contents = [
-        types.TextResourceContents(
-            uri=TEMPLATE_URI,
-            mimeType=MIME_TYPE,
-            text=get_first_app_html(),
-            _meta={
-                "openai/outputTemplate": TEMPLATE_URI,
-                "openai/toolInvocation/invoking": "Running FirstApp",
-                "openai/toolInvocation/invoked": "Completed FirstApp",
-                "openai/widgetAccessible": True,
-                "openai/resultCanProduceWidget": True,
-            },
-            securitySchemes=[{"type": "noauth"},
-                             {
-                                 "type": "oauth2",
-                                 "flows": {
-                                     "authorizationCode": {
-                                         "authorization_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/authorize",
-                                         "token_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/token",
-                                         "registration_endpoint": "https://0c819c023f82.ngrok-free.app/oauth2/register",
-                                         "authorizationUrl": "https://0c819c023f82.ngrok-free.app/oauth2/authorize",
-                                         "tokenUrl": "https://0c819c023f82.ngrok-free.app/oauth2/token",
-                                         "scopes": {
-                                             "token": "token"
-                                         }
-                                     }
-                                 }
-                             }]
-        )
-    ]
-
-    return types.ServerResult(types.ReadResourceResult(contents=contents))
+    return types.ServerResult(types.ReadResourceResult(contents=WIDGET_CACHE.get().resource_contents))
 
 
 # Register the handlers like working example
@@ -730,6 +464,25 @@ async def healthz():
     return {"status": "ok"}
 
 
+class RecommendationQuery(BaseModel):
+    city: str
+    state: str
+    cuisine: str
+
+
+class BatchRecommendationRequest(BaseModel):
+    queries: List[RecommendationQuery] = Field(default_factory=list)
+
+
+@rest_api.post("/recommendations/batch")
+async def batch_recommendations(req: BatchRecommendationRequest):
+    """REST counterpart of first_app_batch_tool."""
+    try:
+        return _batch_recommendations([q.model_dump() for q in req.queries])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @rest_api.get("/.well-known/openid-configuration")
 async def openid_configuration():
     config = {
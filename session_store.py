@@ -0,0 +1,201 @@
+"""Bounded store for per-session message lists.
+
+chat_server kept every session's messages in a dict forever. SessionStore
+caps what stays in memory:
+
+* sessions idle for more than ``ttl`` seconds are evicted;
+* at most ``max_sessions`` sessions and about ``max_bytes`` of messages are
+  resident, the least recently used are evicted first;
+* each session keeps at most its last ``max_messages`` messages.
+
+With ``spill_dir`` set, evicted sessions are written there (msgpack, the
+checkpoint serializer's format) and loaded back on their next request.
+Spill files idle for more than ``spill_ttl`` seconds are deleted by sweep().
+Without it, evicted sessions start over.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# Rough per-message cost on top of its text (object, ids, kwargs)
+_MESSAGE_OVERHEAD = 256
+
+
+def estimate_bytes(messages: List) -> int:
+    return sum(len(str(getattr(m, "content", m))) + _MESSAGE_OVERHEAD for m in messages)
+
+
+class _Session:
+    __slots__ = ("messages", "size", "touched")
+
+    def __init__(self, messages: List, size: int, touched: float):
+        self.messages = messages
+        self.size = size
+        self.touched = touched
+
+
+class SessionStore:
+    """LRU of session_id -> messages with idle TTL, count and byte limits and optional disk spill."""
+
+    def __init__(self, ttl: float = 1800.0, max_sessions: int = 10000, max_bytes: int = 256 * 1024 * 1024,
+                 max_messages: int = 200, spill_dir: Optional[str] = None, spill_ttl: float = 86400.0):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self.spill_dir = spill_dir
+        self.spill_ttl = spill_ttl
+        self.serde = JsonPlusSerializer()
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "faults": 0, "spills": 0, "expired": 0, "evicted": 0}
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    # --- disk --------------------------------------------------------------
+
+    def _spill_path(self, session_id: str) -> str:
+        return os.path.join(self.spill_dir, hashlib.sha1(session_id.encode()).hexdigest() + ".session")
+
+    def _spill(self, session_id: str, session: _Session):
+        type_, data = self.serde.dumps_typed(session.messages)
+        path = self._spill_path(session_id)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(type_.encode() + b"\n" + data)
+        os.replace(tmp, path)
+        self._counters["spills"] += 1
+
+    def _fault_in(self, session_id: str) -> Optional[List]:
+        path = self._spill_path(session_id)
+        try:
+            with open(path, "rb") as f:
+                type_, _, data = f.read().partition(b"\n")
+            os.remove(path)
+            return self.serde.loads_typed((type_.decode(), data))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Dropping unreadable spilled session {path}: {e}")
+            return None
+
+    # --- eviction ----------------------------------------------------------
+
+    def _evict(self, session_id: str, counter: str):
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.size
+        self._counters[counter] += 1
+        if self.spill_dir:
+            try:
+                self._spill(session_id, session)
+            except OSError as e:
+                print(f"Could not spill session {session_id}: {e}")
+
+    def _enforce_limits(self, now: float):
+        # LRU order is also idle order, so expired sessions are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.touched > self.ttl:
+                self._evict(session_id, "expired")
+            elif len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes:
+                self._evict(session_id, "evicted")
+            else:
+                break
+
+    # --- API ---------------------------------------------------------------
+
+    def get(self, session_id: str) -> Optional[List]:
+        """Messages of ``session_id`` (loaded back from disk if spilled), or None."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and now - session.touched <= self.ttl:
+                session.touched = now
+                self._sessions.move_to_end(session_id)
+                self._counters["hits"] += 1
+                return session.messages
+            if session is not None:
+                self._evict(session_id, "expired")
+            messages = self._fault_in(session_id) if self.spill_dir else None
+            if messages is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["faults"] += 1
+            self._store(session_id, messages, now)
+            return messages
+
+    def put(self, session_id: str, messages: List):
+        now = time.monotonic()
+        with self._lock:
+            self._store(session_id, messages, now)
+
+    def _store(self, session_id: str, messages: List, now: float):
+        if len(messages) > self.max_messages:
+            messages = messages[-self.max_messages:]
+        old = self._sessions.pop(session_id, None)
+        if old is not None:
+            self._bytes -= old.size
+        session = _Session(messages, estimate_bytes(messages), now)
+        self._sessions[session_id] = session
+        self._bytes += session.size
+        self._enforce_limits(now)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._bytes -= session.size
+            if self.spill_dir:
+                try:
+                    os.remove(self._spill_path(session_id))
+                except FileNotFoundError:
+                    pass
+
+    def sweep(self) -> int:
+        """Evict idle sessions and delete stale spill files; returns the number of files deleted."""
+        with self._lock:
+            self._enforce_limits(time.monotonic())
+        if not self.spill_dir:
+            return 0
+        removed, cutoff = 0, time.time() - self.spill_ttl
+        for entry in os.scandir(self.spill_dir):
+            if entry.name.endswith(".session") and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            spilled = (sum(1 for name in os.listdir(self.spill_dir) if name.endswith(".session"))
+                       if self.spill_dir else 0)
+            return {"resident": len(self._sessions), "resident_bytes": self._bytes, "spilled": spilled,
+                    **self._counters}
+
+
+def build_session_store() -> SessionStore:
+    """SessionStore configured via SESSION_TTL, SESSION_MAX, SESSION_MAX_BYTES, SESSION_MAX_MESSAGES
+    and SESSION_SPILL_DIR."""
+    return SessionStore(
+        ttl=float(os.environ.get("SESSION_TTL", 1800)),
+        max_sessions=int(os.environ.get("SESSION_MAX", 10000)),
+        max_bytes=int(os.environ.get("SESSION_MAX_BYTES", 256 * 1024 * 1024)),
+        max_messages=int(os.environ.get("SESSION_MAX_MESSAGES", 200)),
+        spill_dir=os.environ.get("SESSION_SPILL_DIR") or None,
+        spill_ttl=float(os.environ.get("SESSION_SPILL_TTL", 86400)),
+    )
@@ -0,0 +1,50 @@
+"""Read-only index format opened without unpickling anything.
+
+FAISS.load_local copies the index into process memory and unpickles the
+docstore, and every worker also json.loads the catalog, so N uvicorn workers
+hold N private copies. Each saved index version also gets a compact metadata
+store keyed by vector ID (see metadata_store). Serving opens only the raw
+FAISS index and that store. With ``mmap=True`` both are memory-mapped
+(IO_FLAG_MMAP), backed by the OS page cache and shared across processes.
+"""
+
+import os
+
+import faiss
+
+from metadata_store import has_metadata_store, open_metadata_store, write_metadata_store
+
+INDEX_NAME = "index.faiss"
+
+# Zero-copy mmap of flat codes where supported, plain mmap otherwise
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def write_shared_metadata(vectorstore, index_dir: str):
+    """Add the metadata store to a directory written by FAISS.save_local."""
+    metadatas = (
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).metadata
+        for i in range(vectorstore.index.ntotal)
+    )
+    write_metadata_store(metadatas, index_dir)
+
+
+class SharedIndex:
+    """FAISS index and its metadata store, opened read-only."""
+
+    def __init__(self, index: faiss.Index, metadata, path: str, mmap: bool = True):
+        self.index = index
+        self.metadata = metadata
+        self.path = path
+        self.mmap = mmap
+
+    @classmethod
+    def open(cls, index_dir: str, mmap: bool = True) -> "SharedIndex":
+        index_path = os.path.join(index_dir, INDEX_NAME)
+        index = faiss.read_index(index_path, _MMAP_FLAGS) if mmap else faiss.read_index(index_path)
+        metadata = open_metadata_store(index_dir, mmap=mmap)
+        return cls(index, metadata, os.path.realpath(index_dir), mmap)
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        return has_metadata_store(index_dir)
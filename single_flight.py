@@ -0,0 +1,141 @@
+"""Request coalescing with a short TTL result cache.
+
+Identical concurrent requests (same normalized key) share one in-flight
+computation: the first caller runs it, the others wait for its result. The
+result is then served from a small TTL cache for ``ttl`` seconds. Errors
+are passed to every waiter and never cached.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+def normalize_key(*parts) -> Tuple:
+    """Case/whitespace-insensitive key; lists become sorted tuples so order does not matter."""
+    def norm(value):
+        if value is None:
+            return None
+        if isinstance(value, (list, tuple, set)):
+            return tuple(sorted(norm(v) for v in value))
+        return " ".join(str(value).split()).casefold()
+    return tuple(norm(part) for part in parts)
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls per key and caches results for ``ttl`` seconds."""
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sync_calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def _cached(self, key) -> Any:
+        entry = self._cache.get(key)
+        if entry is None:
+            return _MISSING
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._cache[key]
+            return _MISSING
+        self._cache.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _store(self, key, value):
+        if self.ttl <= 0:
+            return
+        self._cache[key] = (time.monotonic() + self.ttl, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Return the cached or in-flight result for ``key``, or compute it with ``fn()``."""
+        with self._lock:
+            value = self._cached(key)
+            if value is not _MISSING:
+                return value
+            call = self._sync_calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._sync_calls[key] = _Call()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        else:
+            with self._lock:
+                self._store(key, call.value)
+            return call.value
+        finally:
+            with self._lock:
+                del self._sync_calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of do(); waiters share one task per event loop."""
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            value = self._cached(key)
+            if value is not _MISSING:
+                return value
+            future = self._async_calls.get(flight_key)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                future = self._async_calls[flight_key] = loop.create_task(self._run(flight_key, fn))
+        # A cancelled waiter must not cancel the shared computation
+        return await asyncio.shield(future)
+
+    async def _run(self, flight_key, fn):
+        try:
+            value = await fn()
+            with self._lock:
+                self._store(flight_key[1], value)
+            return value
+        finally:
+            with self._lock:
+                del self._async_calls[flight_key]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.coalesced + self.misses
+        return {"hits": self.hits, "coalesced": self.coalesced, "misses": self.misses,
+                "shared_rate": (self.hits + self.coalesced) / total if total else 0.0,
+                "cached": len(self._cache)}
@@ -0,0 +1,46 @@
+import os
+import sys
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from delta_checkpointer import DeltaSqliteSaver  # noqa: E402
+
+
+def _config(thread_id, checkpoint_id=None):
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def _put(saver, config, values, versions, new_versions):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = values
+    checkpoint["channel_versions"] = versions
+    return saver.put(config, checkpoint, {}, new_versions)
+
+
+def test_hot_read_after_eviction_matches_cold_read(tmp_path):
+    saver = DeltaSqliteSaver(str(tmp_path / "checkpoints.sqlite"), hot_threads=1)
+    first = _put(saver, _config("t1"), {"messages": [1], "city": "Seattle"},
+                 {"messages": "1", "city": "1"}, {"messages": "1", "city": "1"})
+    # Evicts t1 from the hot LRU
+    _put(saver, _config("t2"), {"messages": [9]}, {"messages": "1"}, {"messages": "1"})
+    # Only "messages" changed, "city" is carried over from the first checkpoint
+    _put(saver, _config("t1", first["configurable"]["checkpoint_id"]), {"messages": [1, 2], "city": "Seattle"},
+         {"messages": "2", "city": "1"}, {"messages": "2"})
+
+    hot = saver.get_tuple(_config("t1")).checkpoint["channel_values"]
+    saver.flush()
+    cold = DeltaSqliteSaver(str(tmp_path / "checkpoints.sqlite")).get_tuple(_config("t1"))
+    assert hot == cold.checkpoint["channel_values"] == {"messages": [1, 2], "city": "Seattle"}
+
+
+def test_put_returns_after_commit(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    saver = DeltaSqliteSaver(path)
+    _put(saver, _config("t1"), {"messages": [1]}, {"messages": "1"}, {"messages": "1"})
+    # No flush: a durable put is already on disk when it returns
+    assert DeltaSqliteSaver(path).get_tuple(_config("t1")).checkpoint["channel_values"] == {"messages": [1]}
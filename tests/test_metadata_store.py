@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metadata_store import open_metadata_store, write_columnar, write_metadata_store  # noqa: E402
+from retrieval import PartitionedRetriever  # noqa: E402
+
+
+def test_postings_without_cuisines(tmp_path):
+    # The generated hotel catalog has no "cuisines" field
+    hotels = [
+        {"id": str(i), "name": f"Hotel {i}", "city": "Paris" if i % 2 else "Tokyo", "price_per_night": 100 + i,
+         "amenities": ["wifi"]}
+        for i in range(10)
+    ]
+    write_columnar(hotels, str(tmp_path))
+    store = open_metadata_store(str(tmp_path))
+
+    cities, cuisines = store.postings()
+    assert cuisines == {}
+    assert sorted(cities) == ["paris", "tokyo"]
+    assert cities["paris"].tolist() == [1, 3, 5, 7, 9]
+
+    import faiss
+    index = faiss.IndexFlatL2(4)
+    index.add(np.random.default_rng(0).random((10, 4), dtype=np.float32))
+    result = PartitionedRetriever(index, store).search(np.zeros(4, dtype=np.float32), "Paris", ["Italian"])
+    assert result.rows == []
+
+
+def test_price_range_round_trip(tmp_path):
+    restaurants = [{"id": "1", "name": "Trattoria", "city": "Seattle", "cuisines": ["Italian"], "$$": "$$$"},
+                   {"id": "2", "name": "Diner", "city": "Seattle", "cuisines": ["American"]}]
+    for kind in ("columnar", "sqlite"):
+        index_dir = tmp_path / kind
+        index_dir.mkdir()
+        write_metadata_store(restaurants, str(index_dir), kind=kind)
+        store = open_metadata_store(str(index_dir))
+        assert store[0]["$$"] == "$$$"
+        assert "$$" not in store[1]
@@ -0,0 +1,142 @@
+"""Compressed / approximate FAISS index types for the restaurant store.
+
+The default store is a flat index of 384-dim float32 vectors: memory grows
+linearly and every query scans the whole catalog. ``compress_vectorstore``
+replaces it with one of
+
+    ivf_flat   inverted lists, exact vectors         (nlist)
+    ivf_pq     inverted lists, product quantization  (nlist, pq_m)
+    hnsw       graph search over exact vectors       (hnsw_m)
+    sq8        8-bit scalar quantization, flat scan
+
+trains it on the stored vectors, tunes nprobe/efSearch against the exact
+index to reach a target recall, and returns a recall-vs-latency report.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq8")
+
+NPROBE_CANDIDATES = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+EF_SEARCH_CANDIDATES = [16, 32, 64, 128, 256, 512]
+
+
+def factory_string(index_type: str, num_vectors: int, dim: int, nlist: Optional[int] = None,
+                   pq_m: Optional[int] = None, hnsw_m: int = 32) -> str:
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+    # Rule of thumb: ~4*sqrt(n) lists, but at least 39 training points per list
+    nlist = nlist or max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors // 39))
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    if index_type == "ivf_pq":
+        pq_m = pq_m or next(m for m in (48, 32, 24, 16, 12, 8, 4, 2, 1) if dim % m == 0)
+        return f"IVF{nlist},PQ{pq_m}"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}"
+    return "SQ8"
+
+
+def build_index(vectors: np.ndarray, index_type: str, metric: int = faiss.METRIC_L2, train_size: int = 100_000,
+                chunk_size: int = 65_536, **params) -> faiss.Index:
+    """Train (on a sample) and fill an index from ``vectors``, which may be a memmap."""
+    num_vectors, dim = vectors.shape
+    index = faiss.index_factory(dim, factory_string(index_type, num_vectors, dim, **params), metric)
+    if not index.is_trained:
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(num_vectors, size=min(train_size, num_vectors), replace=False))
+        index.train(np.ascontiguousarray(vectors[sample], dtype=np.float32))
+    for start in range(0, num_vectors, chunk_size):
+        index.add(np.ascontiguousarray(vectors[start:start + chunk_size], dtype=np.float32))
+    return index
+
+
+def apply_search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Set the query-time knobs, which FAISS does not reliably persist with the index."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and nprobe:
+        ivf.nprobe = nprobe
+    if isinstance(index, faiss.IndexHNSW) and ef_search:
+        index.hnsw.efSearch = ef_search
+
+
+def _timed_search(index: faiss.Index, queries: np.ndarray, k: int):
+    start = time.perf_counter()
+    _, labels = index.search(queries, k)
+    return labels, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def _recall(expected: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(e[e >= 0]) & set(f[f >= 0])) for e, f in zip(expected, found))
+    return hits / max(1, int((expected >= 0).sum()))
+
+
+def recall_report(exact: faiss.Index, candidate: faiss.Index, queries: np.ndarray, k: int = 10) -> List[Dict]:
+    """Recall@k and mean per-query latency of ``candidate`` vs ``exact`` over its tuning knob."""
+    expected, exact_ms = _timed_search(exact, queries, k)
+    rows = [{"setting": "exact", "recall": 1.0, "ms_per_query": exact_ms}]
+
+    ivf = faiss.try_extract_index_ivf(candidate)
+    if ivf is not None:
+        settings = [("nprobe", n) for n in NPROBE_CANDIDATES if n <= ivf.nlist]
+    elif isinstance(candidate, faiss.IndexHNSW):
+        settings = [("ef_search", ef) for ef in EF_SEARCH_CANDIDATES]
+    else:
+        settings = [(None, None)]
+
+    for knob, value in settings:
+        if knob:
+            apply_search_params(candidate, **{knob: value})
+        found, ms = _timed_search(candidate, queries, k)
+        row = {"setting": f"{knob}={value}" if knob else "default",
+               "recall": _recall(expected, found), "ms_per_query": ms}
+        if knob:
+            row[knob] = value
+        rows.append(row)
+    return rows
+
+
+def choose_search_params(report: List[Dict], target_recall: float) -> Dict[str, int]:
+    """Cheapest setting reaching ``target_recall``, else the most accurate one."""
+    tuned = [row for row in report[1:] if "nprobe" in row or "ef_search" in row]
+    if not tuned:
+        return {}
+    good = [row for row in tuned if row["recall"] >= target_recall]
+    best = min(good, key=lambda r: r["ms_per_query"]) if good else max(tuned, key=lambda r: r["recall"])
+    return {knob: best[knob] for knob in ("nprobe", "ef_search") if knob in best}
+
+
+def format_report(index_type: str, report: List[Dict], chosen: Dict[str, int], k: int = 10) -> str:
+    lines = [f"Recall@{k} vs exact for {index_type}:"]
+    for row in report:
+        lines.append(f"  {row['setting']:<14} recall={row['recall']:.3f}  {row['ms_per_query']:.3f} ms/query")
+    lines.append(f"  chosen: {chosen or 'defaults'}")
+    return "\n".join(lines)
+
+
+def compress_vectorstore(vectorstore, vectors: np.ndarray, index_type: str, target_recall: float = 0.95,
+                         num_queries: int = 200, k: int = 10, **params) -> Dict:
+    """Swap ``vectorstore.index`` for a trained ``index_type`` index built from ``vectors``.
+
+    Vector positions are preserved, so the docstore mapping stays valid.
+    Returns the index settings to persist (type, search params, report).
+    """
+    exact = vectorstore.index
+    candidate = build_index(vectors, index_type, metric=exact.metric_type, **params)
+
+    rng = np.random.default_rng(1)
+    picks = np.sort(rng.choice(len(vectors), size=min(num_queries, len(vectors)), replace=False))
+    queries = np.ascontiguousarray(vectors[picks], dtype=np.float32)
+    report = recall_report(exact, candidate, queries, k)
+    chosen = choose_search_params(report, target_recall)
+    apply_search_params(candidate, **chosen)
+    print(format_report(index_type, report, chosen, k))
+
+    vectorstore.index = candidate
+    return {"type": index_type, "search_params": chosen, "report": report}